@@ -30,9 +30,22 @@ import click
 
 from common.globalconfig import AMAZON_CREDENTIAL_FILE, GlobalConfig
 from notifications.notifications import NotificationHandler, TIME_FORMAT
-from stores.amazon import Amazon
-from utils.logger import log
+from stores.amazon import CHECK_JOURNAL_PATH, STATE_JOURNAL_PATH, Amazon
+from utils.endpoints import (
+    DEFAULT_PROBE_PORT,
+    DEFAULT_PROBE_SAMPLES,
+    rank_endpoints,
+    resolve_domain,
+)
+from utils.logger import log, rollover_log
+from utils.profile import (
+    get_profile_size,
+    restore_profile,
+    snapshot_profile,
+    trim_profile,
+)
 from utils.version import is_latest, version, get_latest_version
+from utils.startup import start_stage
 
 LICENSE_PATH = os.path.join(
     "cli",
@@ -52,6 +65,30 @@ def sizeof_fmt(num, suffix="B"):
     return "%.1f%s%s" % (num, "Yi", suffix)
 
 
+def manage_profile(trim, snapshot, restore):
+    profile_path = global_config.get_browser_profile_path()
+    snapshot_path = profile_path + "-snapshot"
+    if restore:
+        if restore_profile(snapshot_path, profile_path):
+            log.info(
+                f"Restored profile from '{snapshot_path}' "
+                f"({sizeof_fmt(get_profile_size(profile_path))})"
+            )
+        else:
+            log.warning(f"No profile snapshot found at '{snapshot_path}'")
+    if not os.path.exists(profile_path):
+        return
+    if trim:
+        log.info(f"Profile size before trimming: {get_folder_size(profile_path)}")
+        log.info(f"Trimmed {sizeof_fmt(trim_profile(profile_path))} of browser caches")
+    if snapshot:
+        snapshot_profile(profile_path, snapshot_path)
+        log.info(
+            f"Saved profile snapshot to '{snapshot_path}' "
+            f"({sizeof_fmt(get_profile_size(snapshot_path))})"
+        )
+
+
 # see https://docs.python.org/3/library/signal.html
 def interrupt_handler(signal_num, frame):
     log.info(f"Caught the interrupt signal.  Exiting.")
@@ -72,9 +109,15 @@ def notify_on_crash(func):
     return decorator
 
 
+# Commands that read the logs must not rotate them, every run would push the oldest one out
+READ_ONLY_COMMANDS = {"stats"}
+
+
 @click.group()
-def main():
-    pass
+@click.pass_context
+def main(ctx):
+    if ctx.invoked_subcommand not in READ_ONLY_COMMANDS:
+        rollover_log()
 
 
 # @click.command()
@@ -177,12 +220,36 @@ def main():
     default=False,
     help="Purge the user profile that Fairgame uses for browsing",
 )
+@click.option(
+    "--trim-profile",
+    is_flag=True,
+    default=False,
+    help="Delete browser caches from the user profile, keeping cookies and login",
+)
+@click.option(
+    "--snapshot-profile",
+    is_flag=True,
+    default=False,
+    help="Save a slim copy of the current user profile to restore later with --restore-profile",
+)
+@click.option(
+    "--restore-profile",
+    is_flag=True,
+    default=False,
+    help="Replace the user profile with the snapshot saved by --snapshot-profile",
+)
 @click.option(
     "--clean-credentials",
     is_flag=True,
     default=False,
     help="Purge Amazon credentials and prompt for new credentials",
 )
+@click.option(
+    "--clean-state",
+    is_flag=True,
+    default=False,
+    help="Forget which ASIN groups were already ordered and where checking left off",
+)
 @click.option(
     "--alt-offers",
     is_flag=True,
@@ -195,6 +262,97 @@ def main():
     default=False,
     help="Wait if captcha could not be solved. Only occurs if enters captcha handler during checkout.",
 )
+@click.option(
+    "--direct-checkout",
+    is_flag=True,
+    default=False,
+    help="After adding to cart, go straight to the checkout page instead of through the cart",
+)
+@click.option(
+    "--prefetch",
+    is_flag=True,
+    default=False,
+    help="Load the next item's offer page in a second tab while the current one is checked",
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Keep a tab open per item and refresh only its offers instead of reloading the page",
+)
+@click.option(
+    "--http-probe",
+    is_flag=True,
+    default=False,
+    help="Check stock with lightweight HTTP requests and only use the browser to buy",
+)
+@click.option(
+    "--scheduler",
+    is_flag=True,
+    default=False,
+    help="Check items by priority and interval (priority_N/interval_N in amazon_config.json)",
+)
+@click.option(
+    "--standby-browser",
+    is_flag=True,
+    default=False,
+    help="Keep a second browser ready on a copy of the profile to take over if Chrome fails",
+)
+@click.option(
+    "--max-browser-memory",
+    type=int,
+    default=0,
+    help="Restart Chrome between stock checks once it uses more than this many MB (0 to disable)",
+)
+@click.option(
+    "--max-browser-cpu",
+    type=float,
+    default=0,
+    help="Restart Chrome between stock checks when its CPU use stays above this percent (0 to disable)",
+)
+@click.option(
+    "--lean",
+    is_flag=True,
+    default=False,
+    help="Launch Chrome with the lean profile from fairgame.conf (fewer features, blocked fonts, media and ads)",
+)
+@click.option(
+    "--telemetry",
+    is_flag=True,
+    default=False,
+    help="Collect per page browser metrics and warn when pages get heavier or slower",
+)
+@click.option(
+    "--cdp-engine",
+    is_flag=True,
+    default=False,
+    help="Load offer pages over the Chrome DevTools protocol and wait on load events instead of polling",
+)
+@click.option(
+    "--fast-startup",
+    is_flag=True,
+    default=False,
+    help="Check the login from the profile's cookies and start checking stock without loading the home page",
+)
+@click.option(
+    "--check-journal",
+    is_flag=True,
+    default=False,
+    help="Save every stock check (offers, prices, outcome, latency) to a local SQLite database",
+)
+@click.option(
+    "--pin-endpoint",
+    is_flag=True,
+    default=False,
+    help="Point Chrome at the fastest measured endpoints of the site and of www.<domain> (sign-in "
+    "and checkout) instead of what DNS returns",
+)
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Record page snapshots and decisions to a compressed session archive for replay",
+)
 @notify_on_crash
 def amazon(
     no_image,
@@ -213,9 +371,28 @@ def amazon(
     log_stock_check,
     shipping_bypass,
     clean_profile,
+    trim_profile,
+    snapshot_profile,
+    restore_profile,
     clean_credentials,
+    clean_state,
     alt_offers,
     captcha_wait,
+    direct_checkout,
+    prefetch,
+    watch,
+    http_probe,
+    scheduler,
+    standby_browser,
+    max_browser_memory,
+    max_browser_cpu,
+    lean,
+    telemetry,
+    cdp_engine,
+    fast_startup,
+    check_journal,
+    pin_endpoint,
+    record,
 ):
     notification_handler.sound_enabled = not disable_sound
     if not notification_handler.sound_enabled:
@@ -229,10 +406,16 @@ def amazon(
         shutil.rmtree(global_config.get_browser_profile_path())
         log.info(f"Freed {profile_size}")
 
+    manage_profile(trim_profile, snapshot_profile, restore_profile)
+
     if clean_credentials and os.path.exists(AMAZON_CREDENTIAL_FILE):
         log.info(f"Removing existing Amazon credentials from {AMAZON_CREDENTIAL_FILE}")
         os.remove(AMAZON_CREDENTIAL_FILE)
 
+    if clean_state and os.path.exists(STATE_JOURNAL_PATH):
+        log.info(f"Removing saved run state from {STATE_JOURNAL_PATH}")
+        os.remove(STATE_JOURNAL_PATH)
+
     amzn_obj = Amazon(
         headless=headless,
         notification_handler=notification_handler,
@@ -249,6 +432,21 @@ def amazon(
         shipping_bypass=shipping_bypass,
         alt_offers=alt_offers,
         wait_on_captcha_fail=captcha_wait,
+        direct_checkout=direct_checkout,
+        prefetch=prefetch,
+        watch=watch,
+        http_probe=http_probe,
+        scheduler=scheduler,
+        standby_browser=standby_browser,
+        max_browser_memory=max_browser_memory,
+        max_browser_cpu=max_browser_cpu,
+        lean=lean,
+        telemetry=telemetry,
+        cdp_engine=cdp_engine,
+        record=record,
+        fast_startup=fast_startup,
+        check_journal=check_journal,
+        pin_endpoint=pin_endpoint,
     )
     try:
         amzn_obj.run(delay=delay, test=test)
@@ -266,6 +464,7 @@ def amazon(
 )
 @click.command()
 def test_notifications(disable_sound):
+    notification_handler.wait_until_ready()
     enabled_handlers = ", ".join(notification_handler.enabled_handlers)
     message_time = datetime.now().strftime(TIME_FORMAT)
     notification_handler.send_notification(
@@ -324,64 +523,66 @@ def show(w, c):
     "--domain",
     help="Specify the domain you want to find endpoints for (e.g. www.amazon.de, www.amazon.com, smile.amazon.com.",
 )
-def find_endpoints(domain):
+@click.option(
+    "--port",
+    type=int,
+    default=DEFAULT_PROBE_PORT,
+    help="Port to measure connection times on",
+)
+@click.option(
+    "--samples",
+    type=int,
+    default=DEFAULT_PROBE_SAMPLES,
+    help="Connections made to each endpoint when ranking them",
+)
+@click.option(
+    "--dns-server",
+    multiple=True,
+    help="Ask only this DNS server instead of the public ones in fairgame.conf, can be repeated",
+)
+@click.option("--dns-port", type=int, default=53, help="Port the DNS servers listen on")
+def find_endpoints(domain, port, samples, dns_server, dns_port):
     import dns.resolver
 
     if not domain:
         log.error("You must specify a domain to resolve for endpoints with --domain.")
         exit(0)
     log.info(f"Attempting to resolve '{domain}'")
-    # Default
-    my_resolver = dns.resolver.Resolver()
-    try:
-        resolved = my_resolver.resolve(domain)
-        for rdata in resolved:
-            log.info(f"Your computer resolves {domain} to {rdata.address}")
-    except Exception as e:
-        log.error(f"Failed to use local resolver due to: {e}")
-        exit(1)
+    if dns_server:
+        dns_servers = {"--dns-server": list(dns_server)}
+    else:
+        # Default
+        my_resolver = dns.resolver.Resolver()
+        try:
+            resolved = my_resolver.resolve(domain)
+            for rdata in resolved:
+                log.info(f"Your computer resolves {domain} to {rdata.address}")
+        except Exception as e:
+            log.error(f"Failed to use local resolver due to: {e}")
+            exit(1)
+        dns_servers = global_config.get_fairgame_config().get("public_dns_servers")
 
     # Find endpoints from various DNS servers
-    endpoints, resolutions = resolve_domain(domain)
+    endpoints, resolutions = resolve_domain(domain, dns_servers, port=dns_port)
     log.info(
         f"{domain} resolves to at least {len(endpoints)} distinct IP addresses across {resolutions} lookups:"
     )
-    endpoints = sorted(endpoints)
-    for endpoint in endpoints:
-        log.info(f" {endpoint}")
-
-    return endpoints
-
-
-def resolve_domain(domain):
-    import dns.resolver
-
-    public_dns_servers = global_config.get_fairgame_config().get("public_dns_servers")
-    resolutions = 0
-    endpoints = set()
+    log.info(f"Ranking by connection time to port {port}, fastest first:")
+    ranking = rank_endpoints(
+        endpoints, port=port, samples=samples, server_name=domain, tls=port == 443
+    )
+    for result in ranking:
+        if result.median is None:
+            log.info(f" {result.address}: unreachable")
+            continue
+        line = f" {result.address}: median {result.median * 1000:.1f}ms, jitter {result.jitter * 1000:.1f}ms"
+        if result.tls_median is not None:
+            line += f", TLS handshake {result.tls_median * 1000:.1f}ms"
+        if result.failures:
+            line += f", {result.failures}/{samples} failed"
+        log.info(line)
 
-    # Resolve the domain for each DNS server to find out how many end points we have
-    for provider in public_dns_servers:
-        # Provider is Google, Verisign, etc.
-        log.info(f"Testing {provider}")
-        for server in public_dns_servers[provider]:
-            # Server is 8.8.8.8 or 1.1.1.1
-            my_resolver = dns.resolver.Resolver()
-            my_resolver.nameservers = [server]
-
-            try:
-                resolved = my_resolver.resolve(domain)
-            except Exception as e:
-                log.warning(
-                    f"Unable to resolve using {provider} server {server} due to: {e}"
-                )
-                continue
-            for rdata in resolved:
-                ipv4_address = rdata.address
-                endpoints.add(ipv4_address)
-                resolutions += 1
-                log.debug(f"{domain} resolves to {ipv4_address} via {server}")
-    return endpoints, resolutions
+    return [result.address for result in ranking]
 
 
 @click.command()
@@ -394,7 +595,9 @@ def show_traceroutes(domain):
         exit(0)
 
     # Get the endpoints to test
-    endpoints, resolutions = resolve_domain(domain=domain)
+    endpoints, resolutions = resolve_domain(
+        domain, global_config.get_fairgame_config().get("public_dns_servers")
+    )
 
     if platform.system() == "Windows":
         trace_command = "tracert -d "
@@ -406,6 +609,133 @@ def show_traceroutes(domain):
         log.info(f" {trace_command}{endpoint}")
 
 
+@click.command()
+@click.option(
+    "--hours",
+    type=float,
+    default=24,
+    help="How many hours back to report on, ending now or at --until",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    default=None,
+    help="Start of the window, overrides --hours",
+)
+@click.option("--until", type=click.DateTime(), default=None, help="End of the window")
+def stats(hours, since, until):
+    """Check counts, latency percentiles, timeouts, checkout stages and driver restarts from the
+    logs and the stock check journal"""
+    from utils.stats import collect_stats
+
+    until = until.timestamp() if until else time.time()
+    since = since.timestamp() if since else until - hours * 3600
+    log.info(
+        f"Stats from {datetime.fromtimestamp(since):%Y-%m-%d %H:%M} "
+        f"to {datetime.fromtimestamp(until):%Y-%m-%d %H:%M}"
+    )
+    for line in collect_stats(since, until, journal_path=CHECK_JOURNAL_PATH).report():
+        log.info(line)
+
+
+@click.command()
+@click.argument("archive", type=click.Path(exists=True, dir_okay=False))
+def replay(archive):
+    """Replays the stock checks of a session recorded with --record and reports divergence and
+    decision latency.  Checkout pages are only checked for how their titles are classified
+    """
+    from stores.amazon import (
+        build_replay_driver,
+        load_recorded_session,
+        replay_session,
+    )
+
+    records = load_recorded_session(archive)
+    log.info(f"Loaded {len(records)} records from {archive}")
+    notification_handler.sound_enabled = False
+    amzn_obj = Amazon(
+        notification_handler=notification_handler,
+        disable_presence=True,
+        driver=build_replay_driver(records),
+    )
+    results = replay_session(amzn_obj, records)
+
+    replayed_count = {"stock_check": 0, "checkout_title": 0}
+    divergent = {"stock_check": 0, "checkout_title": 0}
+    skipped = 0
+    recorded_latency = []
+    replay_latency = []
+    for kind, key, recorded, replayed, recorded_time, replay_time in results:
+        if replayed is None:
+            skipped += 1
+            continue
+        replayed_count[kind] += 1
+        if recorded != replayed:
+            divergent[kind] += 1
+            log.warning(f"{kind} {key}: recorded {recorded}, replayed {replayed}")
+        if kind == "stock_check":
+            recorded_latency.append(recorded_time)
+            replay_latency.append(replay_time)
+    log.info(
+        f"Replayed {replayed_count['stock_check']} stock check decisions, "
+        f"{divergent['stock_check']} diverged, {skipped} had nothing recorded to replay"
+    )
+    log.info(
+        f"Classified {replayed_count['checkout_title']} checkout page titles, "
+        f"{divergent['checkout_title']} differently than recorded"
+    )
+    if replay_latency:
+        # The recorded latency includes loading the offer page, the replayed one is only the
+        # evaluation of an already loaded snapshot, so they aren't comparable
+        log.info(
+            f"Stock check recorded latency (page load + evaluation): mean "
+            f"{sum(recorded_latency) / len(recorded_latency):.3f}s"
+        )
+        log.info(
+            f"Stock check replayed latency (evaluation only): mean "
+            f"{sum(replay_latency) / len(replay_latency):.3f}s"
+        )
+
+
+@click.command()
+@click.option(
+    "--rounds",
+    type=int,
+    default=10,
+    show_default=True,
+    help="How many times to run the stock check and checkout over the fixtures",
+)
+def benchmark(rounds):
+    """Times the stock check and checkout code against the fixture pages in
+    stores/fixtures/amazon, without a browser or an Amazon account"""
+    from stores.amazon import (
+        BENCHMARK_AUTOBUY_CONFIG,
+        benchmark_session,
+        build_benchmark_driver,
+    )
+
+    notification_handler.sound_enabled = False
+    amzn_obj = Amazon(
+        notification_handler=notification_handler,
+        disable_presence=True,
+        driver=build_benchmark_driver(),
+        autobuy_config=BENCHMARK_AUTOBUY_CONFIG,
+    )
+    try:
+        check_latency, checkout_latency = benchmark_session(amzn_obj, rounds)
+    except RuntimeError as e:
+        log.error(f"Benchmark failed: {e}")
+        exit(1)
+    for name, latency in (
+        ("Stock check", check_latency),
+        ("Checkout", checkout_latency),
+    ):
+        log.info(
+            f"{name}: mean {sum(latency) / len(latency):.4f}s, "
+            f"max {max(latency):.4f}s over {len(latency)} rounds"
+        )
+
+
 # Register Signal Handler for Interrupt
 signal(SIGINT, interrupt_handler)
 
@@ -414,17 +744,26 @@ main.add_command(test_notifications)
 main.add_command(show)
 main.add_command(find_endpoints)
 main.add_command(show_traceroutes)
+main.add_command(replay)
+main.add_command(benchmark)
+main.add_command(stats)
+
+
+def check_version():
+    if is_latest():
+        log.info(f"FairGame v{version}")
+    elif version.is_prerelease:
+        log.warning(f"FairGame PRE-RELEASE v{version}")
+    else:
+        log.warning(
+            f"You are running FairGame v{version}, but the most recent version is v{get_latest_version()}. "
+            f"Consider upgrading "
+        )
+
 
 # Global scope stuff here
-if is_latest():
-    log.info(f"FairGame v{version}")
-elif version.is_prerelease:
-    log.warning(f"FairGame PRE-RELEASE v{version}")
-else:
-    log.warning(
-        f"You are running FairGame v{version}, but the most recent version is v{get_latest_version()}. "
-        f"Consider upgrading "
-    )
+# The GitHub lookup runs in the background so it doesn't hold up startup
+start_stage("version_check", check_version)
 
 global_config = GlobalConfig()
 notification_handler = NotificationHandler()
@@ -60,13 +60,14 @@ class GlobalConfig:
         self.profile_path = None
         self.get_browser_profile_path()
 
-    def get_amazon_config(self, encryption_pass=None):
+    def get_amazon_config(self, encryption_pass=None, credentials=True):
         log.info("Initializing Amazon configuration...")
         # Load up all things Amazon
         amazon_config = self.global_config["AMAZON"]
-        amazon_config["username"], amazon_config["password"] = get_credentials(
-            AMAZON_CREDENTIAL_FILE, encryption_pass
-        )
+        if credentials:
+            amazon_config["username"], amazon_config["password"] = get_credentials(
+                AMAZON_CREDENTIAL_FILE, encryption_pass
+            )
         return amazon_config
 
     def get_fairgame_config(self):
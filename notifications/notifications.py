@@ -24,6 +24,7 @@ from playsound import playsound
 import apprise
 
 from utils.logger import log
+from utils.startup import start_stage
 
 TIME_FORMAT = "%Y-%m-%d @ %H:%M:%S"
 
@@ -39,29 +40,44 @@ class NotificationHandler:
 
     def __init__(self):
         if path.exists(APPRISE_CONFIG_PATH):
-            log.info(f"Initializing Apprise handler using: {APPRISE_CONFIG_PATH}")
-            self.apb = apprise.Apprise()
-            config = apprise.AppriseConfig()
-            config.add(APPRISE_CONFIG_PATH)
-            # Get the service names from the config, not the Apprise instance when reading from config file
-            for server in config.servers():
-                log.info(f"Found {server.service_name} configuration")
-                self.enabled_handlers.append(server.service_name)
-            self.apb.add(config)
+            # Loading the services is slow, messages queue up until it's done
+            self.apb = None
             self.queue = queue.Queue()
-            self.start_worker()
             self.enabled = True
+            self.ready = start_stage("apprise", self.load_apprise)
+            self.start_worker()
         else:
             self.enabled = False
             log.info(f"No Apprise config found at {APPRISE_CONFIG_PATH}.")
             log.info(f"For notifications, see {APPRISE_CONFIG_PATH}_template")
 
+    def load_apprise(self):
+        log.info(f"Initializing Apprise handler using: {APPRISE_CONFIG_PATH}")
+        apb = apprise.Apprise()
+        config = apprise.AppriseConfig()
+        config.add(APPRISE_CONFIG_PATH)
+        # Get the service names from the config, not the Apprise instance when reading from config file
+        for server in config.servers():
+            log.info(f"Found {server.service_name} configuration")
+            self.enabled_handlers.append(server.service_name)
+        apb.add(config)
+        self.apb = apb
+
+    def wait_until_ready(self, timeout=None):
+        if self.enabled:
+            try:
+                self.ready.wait(timeout)
+            except Exception as e:
+                log.error(f"Apprise failed to load: {e}")
+                self.enabled = False
+
     def send_notification(self, message, ss_name=[], **kwargs):
         if self.enabled:
             self.queue.put((message, ss_name))
 
     def message_sender(self):
-        while True:
+        self.wait_until_ready()
+        while self.enabled:
             message, ss_name = self.queue.get()
 
             if ss_name:
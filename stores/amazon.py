@@ -17,11 +17,12 @@
 #      The author may be contacted through the project's GitHub, at:
 #      https://github.com/Hari-Nagarajan/fairgame
 
-import fileinput
+import copy
 import json
 import math
 import os
 import platform
+import threading
 import time
 from contextlib import contextmanager
 from datetime import datetime
@@ -29,10 +30,11 @@ from enum import Enum
 from typing import List
 
 import psutil
+import requests
 from amazoncaptcha import AmazonCaptcha
 from chromedriver_py import binary_path  # this will get you the path variable
 from furl import furl
-from lxml import html
+from lxml import etree, html
 from price_parser import parse_price, Price
 from pypresence import exceptions as pyexceptions
 from selenium import webdriver
@@ -46,7 +48,45 @@ from selenium.webdriver.support.ui import WebDriverWait
 from utils import discord_presence as presence
 from utils.debugger import debug
 from utils.logger import log
-from utils.selenium_utils import options, enable_headless
+from utils.cdp import EventLoopThread, attach_to_page
+from utils.check_journal import CheckJournal
+from utils.circuit_breaker import CircuitBreaker
+from utils.fake_webdriver import FakeWebDriver, load_fixture
+from utils.endpoints import (
+    load_ranking,
+    probe_endpoint,
+    rank_endpoints,
+    resolve_domain,
+    save_ranking,
+)
+from utils.events import (
+    AddToCartFailed,
+    AddedToCart,
+    CheckoutFailed,
+    Event,
+    EventBus,
+    OrderPlaced,
+    StockFound,
+)
+from utils.http import TimeoutHTTPAdapter
+from utils.metrics import metrics
+from utils.profile import clear_crashed_exit, clone_profile, get_profile_size
+from utils.telemetry import (
+    PageTelemetry,
+    parse_performance_metrics,
+    summarize_network_log,
+)
+from utils.watchdog import ResourceWatchdog
+from utils.startup import start_stage, timed_stage
+from utils.state_journal import StateJournal
+from utils.state_machine import StateMachine
+from utils.scheduler import PollScheduler, ScheduledItem
+from utils.session_recorder import SessionRecorder, read_session, snapshot_page
+from utils.selenium_utils import (
+    options,
+    enable_headless,
+    add_cookies_to_session_from_driver,
+)
 
 # Optional OFFER_URL is:     "OFFER_URL": "https://{domain}/dp/",
 AMAZON_URLS = {
@@ -55,10 +95,158 @@ AMAZON_URLS = {
     "OFFER_URL": "https://{domain}/dp/",
     "CART_URL": "https://{domain}/gp/cart/view.html",
     "ATC_URL": "https://{domain}/gp/aws/cart/add.html",
+    "AOD_URL": "https://{domain}/gp/aod/ajax?pc=dp&asin=",
 }
 CHECKOUT_URL = "https://{domain}/gp/cart/desktop/go-to-checkout.html/ref=ox_sc_proceed?partialCheckoutCart=1&isToBeGiftWrappedBefore=0&proceedToRetailCheckout=Proceed+to+checkout&proceedToCheckout=1&cartInitiateId={cart_id}"
 
 AUTOBUY_CONFIG_PATH = "config/amazon_config.json"
+STATE_JOURNAL_PATH = "config/amazon_state.jsonl"
+CHECK_JOURNAL_PATH = "logs/stock_checks.sqlite3"
+ENDPOINT_CACHE_PATH = "config/endpoint_ranking.json"
+CHECKOUT_BASELINE_PATH = "config/checkout_baseline.json"
+BENCHMARK_FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures", "amazon"
+)
+# URL patterns of the benchmark fixture pages
+BENCHMARK_FIXTURE_PAGES = {
+    "*/dp/*": "offers",
+    "*/gp/aws/cart/add.html*": "add_to_cart",
+    "*/gp/cart/view.html": "cart",
+    "*/gp/buy/spc/handlers/display.html": "checkout",
+    "*/gp/buy/thankyou/handlers/display.html": "order_complete",
+}
+# The fixture offers are one over and one inside this reserve
+BENCHMARK_AUTOBUY_CONFIG = {
+    "amazon_website": "smile.amazon.com",
+    "asin_list": [["B0FIXTURE1"]],
+    "reserve_min": [500.0],
+    "reserve_max": [750.0],
+    "priorities": [0],
+    "check_intervals": [None],
+}
+
+# What identifies the offers in a container: their normalized text and offer IDs.  Fragments
+# also carry per-request tokens, which must not count as a change
+WATCH_OFFER_KEY_JS = """
+function offerKey(node) {
+    var key = (node.textContent || '').replace(/\\s+/g, ' ').trim();
+    var ids = node.querySelectorAll("input[name='offeringID.1']");
+    for (var i = 0; i < ids.length; i++) { key += '|' + ids[i].value; }
+    return key;
+}
+"""
+
+# Installed once per watch tab.  Records every change to the offer container so that refreshes
+# can report back whether the offers actually changed.
+WATCH_INSTALL_JS = WATCH_OFFER_KEY_JS + """
+var container = document.getElementById('aod-container');
+if (!container) { return false; }
+if (!window.__fairgameWatch) {
+    var state = {changes: 0, reported: 0, changedAt: 0, last: offerKey(container)};
+    new MutationObserver(function (mutations) {
+        state.changes += mutations.length;
+        state.changedAt = Date.now();
+    }).observe(container, {childList: true, subtree: true, characterData: true});
+    window.__fairgameWatch = state;
+}
+return true;
+"""
+
+# Async script: fetches the offers fragment the flyout uses and swaps it into the container in
+# place when its offers differ.  Resolves with whether the MutationObserver saw any change since
+# the last refresh.
+WATCH_REFRESH_JS = WATCH_OFFER_KEY_JS + """
+var url = arguments[0];
+var done = arguments[arguments.length - 1];
+var state = window.__fairgameWatch;
+var container = document.getElementById('aod-container');
+if (!state || !container) { done({error: 'watch is not installed'}); return; }
+fetch(url, {credentials: 'include'}).then(function (response) {
+    if (!response.ok) { throw new Error('HTTP ' + response.status); }
+    return response.text();
+}).then(function (text) {
+    var fragment = new DOMParser().parseFromString(text, 'text/html');
+    var offers = fragment.getElementById('aod-container') || fragment.body;
+    var key = offerKey(offers);
+    if (key !== state.last) {
+        state.last = key;
+        container.innerHTML = offers.innerHTML;
+    }
+    // Observer callbacks are delivered as a microtask, so report after they have run
+    setTimeout(function () {
+        var changed = state.changes !== state.reported;
+        state.reported = state.changes;
+        done({bytes: text.length, changed: changed, changedAt: state.changedAt});
+    }, 0);
+}).catch(function (e) { done({error: String(e)}); });
+"""
+
+# Hashes the normalized text of the offer container, plus the offer IDs which don't show up as text
+OFFER_HASH_JS = """
+var node = document.getElementById('aod-container') || document.getElementById('olpOfferList');
+if (!node) { return null; }
+var text = (node.textContent || '').replace(/\\s+/g, ' ').trim();
+var ids = node.querySelectorAll("input[name='offeringID.1']");
+for (var i = 0; i < ids.length; i++) { text += '|' + ids[i].value; }
+var hash = 0x811c9dc5;
+for (var j = 0; j < text.length; j++) {
+    hash ^= text.charCodeAt(j);
+    hash = Math.imul(hash, 0x01000193);
+}
+return text.length + ':' + (hash >>> 0).toString(16);
+"""
+
+# Bytes transferred by the current page so far, from the resource timing entries
+PAGE_WEIGHT_JS = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var bytes = 0;
+for (var i = 0; i < entries.length; i++) {
+    bytes += entries[i].transferSize || 0;
+}
+return {bytes: bytes, requests: entries.length};
+"""
+
+# Parts of the offer page check_stock looks at, and whether their content matters or only that
+# they exist.  Recorded sessions keep these instead of the whole page
+OFFER_SNAPSHOT_XPATHS = [
+    ("//div[@class='nav-footer-line'] | //div[@id='navFooter']", False),
+    ("//img[@alt='Dogs of Amazon']", True),
+    ("//*[@id='nav-cart-count']", True),
+    ("/html/body/div[@id='all-offers-display']", False),
+    ("//div[@id='aod-container']", True),
+    ("//div[@id='olpOfferList']", True),
+    ("//div[@id='backInStock' or @id='outOfStock']", True),
+    ("//span[@data-action='show-all-offers-display']", True),
+    ("//input[@name='submit.add-to-cart']", True),
+]
+OFFER_SNAPSHOT_JS = """
+var xpaths = arguments[0];
+var captured = [];
+var fragments = [];
+for (var i = 0; i < xpaths.length; i++) {
+    var result = document.evaluate(xpaths[i][0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var j = 0; j < result.snapshotLength; j++) {
+        var node = result.snapshotItem(j);
+        if (captured.some(function (c) { return c.contains(node); })) { continue; }
+        if (xpaths[i][1]) {
+            captured.push(node);
+            fragments.push(node.outerHTML);
+        } else {
+            fragments.push(node.cloneNode(false).outerHTML);
+        }
+    }
+}
+return fragments;
+"""
+# Pages that stand in for add to cart when replaying a recorded session
+REPLAY_ATC_PAGE = (
+    "<html><head><title></title></head><body>"
+    "<form><input type='submit' name='add' value='add'/></form></body></html>"
+)
+REPLAY_CART_PAGE = (
+    "<html><head><title></title></head><body>"
+    "<span id='nav-cart-count'>1</span></body></html>"
+)
 
 BUTTON_XPATHS = [
     '//input[@name="placeYourOrder1"]',
@@ -88,6 +276,27 @@ MAX_CHECKOUT_BUTTON_WAIT = 3  # integers only
 DEFAULT_REFRESH_DELAY = 3
 DEFAULT_MAX_TIMEOUT = 10
 DEFAULT_MAX_URL_FAIL = 5
+DEFAULT_PROBE_TIMEOUT = 5
+DEFAULT_EVENT_DRAIN_TIMEOUT = 30
+DEFAULT_CONFIG_POLL_INTERVAL = 1  # seconds between looks at amazon_config.json
+DEFAULT_ENDPOINT_CACHE_AGE = 6 * 3600  # seconds a ranking is trusted before re-ranking
+DEFAULT_PIN_CHECK_INTERVAL = 300  # seconds between measurements of the pinned endpoint
+# The pinned endpoint is re-ranked once its connect time is more than double what it was and
+# at least this many seconds slower
+DEFAULT_PIN_DEGRADE_FACTOR = 2
+DEFAULT_PIN_DEGRADE_MARGIN = 0.02
+# at-main, sess-at-main, x-main on amazon.com and at-acbuk etc. on the other sites
+AUTH_COOKIE_PREFIXES = ("at-", "sess-at-", "x-")
+DEFAULT_CONDITION_POLL = 0.1  # seconds between checks when waiting on a page condition
+DEFAULT_PROBE_SESSION_AGE = 600  # re-seed the probe session from the browser this often
+DEFAULT_MAX_WATCH_SETUP_TRIES = 3
+DEFAULT_BASELINE_SAMPLES = (
+    20  # cart flow times the direct checkout baseline averages over
+)
+DEFAULT_BROWSER_STARTUP_TIMEOUT = (
+    60  # seconds to wait on a browser launch being abandoned
+)
+DEFAULT_WATCH_SETUP_BACKOFF = 5  # seconds, times the number of failed tries
 
 amazon_config = {}
 
@@ -110,11 +319,32 @@ class Amazon:
         shipping_bypass=False,
         alt_offers=False,
         wait_on_captcha_fail=False,
+        direct_checkout=False,
+        prefetch=False,
+        watch=False,
+        http_probe=False,
+        scheduler=False,
+        standby_browser=False,
+        max_browser_memory=0,
+        max_browser_cpu=0,
+        lean=False,
+        telemetry=False,
+        cdp_engine=False,
+        driver=None,
+        autobuy_config=None,
+        record=None,
+        fast_startup=False,
+        check_journal=False,
+        pin_endpoint=False,
     ):
         self.notification_handler = notification_handler
         self.asin_list = []
         self.reserve_min = []
         self.reserve_max = []
+        self.priorities = []
+        self.check_intervals = []
+        self.config_version = None
+        self.config_checked = 0
         self.checkshipping = checkshipping
         self.button_xpaths = BUTTON_XPATHS
         self.detailed = detailed
@@ -127,8 +357,12 @@ class Amazon:
         self.take_screenshots = not no_screenshots
         self.start_time = time.time()
         self.start_time_atc = 0
+        self.atc_confirmed_time = 0
+        self.checkout_path = None
         self.webdriver_child_pids = []
         self.driver = None
+        # Tests, benchmarks and replays bring their own driver
+        self.browserless = driver is not None
         self.refresh_delay = DEFAULT_REFRESH_DELAY
         self.testing = False
         self.slow_mode = slow_mode
@@ -138,16 +372,72 @@ class Amazon:
         self.log_stock_check = log_stock_check
         self.shipping_bypass = shipping_bypass
         self.unknown_title_notification_sent = False
+        self.checkout_machine = None
         self.alt_offers = alt_offers
         self.wait_on_captcha_fail = wait_on_captcha_fail
+        self.direct_checkout = direct_checkout
+        self.prefetch = prefetch
+        self.check_tab = None
+        self.prefetch_tab = None
+        self.watch = watch
+        self.watch_tabs = {}
+        self.http_probe = http_probe
+        self.scheduler = scheduler
+        self.check_outcome = None
+        self.captcha_seen = False
+        self.checking = None
+        self.check_started = 0
+        # What the current stock check saw, for the check journal
+        self.check_details = {}
+        self.recorder = SessionRecorder(record) if record else None
+        self.check_journal = CheckJournal(CHECK_JOURNAL_PATH) if check_journal else None
+        self.pin_endpoint = pin_endpoint
+        # Host name -> the endpoint it is pinned to
+        self.pinned_endpoints = {}
+        self.pin_changed = False
+        self.pin_checked = time.time()
+        self.pinned_at = 0
+        self.pin_thread = None
+        self.fast_startup = fast_startup
+        self.home_page_preloaded = False
+        self.stock_check_breaker = CircuitBreaker(name="Stock check")
+        self.standby_browser = standby_browser
+        self.standby_driver = None
+        self.standby_child_pids = []
+        self.standby_profile_path = None
+        self.standby_lock = threading.Lock()
+        self.standby_thread = None
+        self.page_telemetry = (
+            PageTelemetry(on_alert=self.send_telemetry_alert) if telemetry else None
+        )
+        self.cdp_engine = EventLoopThread() if cdp_engine else None
+        self.events = EventBus()
+        self.subscribe_side_effects()
+        self.cdp_page = None
+        self.resource_watchdog = ResourceWatchdog(
+            get_root_pid=self.get_webdriver_pid,
+            max_rss_mb=max_browser_memory,
+            max_cpu_percent=max_browser_cpu,
+        )
+        self.probe_session = None
+        self.probe_session_time = 0
+        # ASIN -> (offer hash, reserve min, reserve max) of the last check that found nothing
+        self.unchanged_offers = {}
 
-        presence.enabled = not disable_presence
+        # Browserless runs have nothing to show on Discord
+        presence.enabled = not disable_presence and not driver
 
         global amazon_config
         from cli.cli import global_config
 
-        amazon_config = global_config.get_amazon_config(encryption_pass)
         self.profile_path = global_config.get_browser_profile_path()
+        lean_profile = global_config.get_fairgame_config().get("lean_profile", {})
+        self.lean_switches = list(lean_profile.get("switches", [])) if lean else []
+        self.lean_blocked_urls = (
+            list(lean_profile.get("blocked_urls", [])) if lean else []
+        )
+        # The standby browser runs on a copy of the profile, and takes over the profile it ran on
+        self.active_profile_path = self.profile_path
 
         try:
             presence.start_presence()
@@ -168,49 +458,152 @@ class Amazon:
             except:
                 raise
 
-        if os.path.exists(AUTOBUY_CONFIG_PATH):
-            with open(AUTOBUY_CONFIG_PATH) as json_file:
-                try:
-                    config = json.load(json_file)
-                    self.asin_groups = int(config["asin_groups"])
-                    self.amazon_website = config.get(
-                        "amazon_website", "smile.amazon.com"
-                    )
-                    for x in range(self.asin_groups):
-                        self.asin_list.append(config[f"asin_list_{x + 1}"])
-                        self.reserve_min.append(float(config[f"reserve_min_{x + 1}"]))
-                        self.reserve_max.append(float(config[f"reserve_max_{x + 1}"]))
-                    # assert isinstance(self.asin_list, list)
-                except Exception as e:
-                    log.error(f"{e} is missing")
-                    log.error(
-                        "amazon_config.json file not formatted properly: https://github.com/Hari-Nagarajan/fairgame/wiki/Usage#json-configuration"
-                    )
-                    exit(0)
+        # Groups ordered before a crash or restart are not hunted again.  Browserless runs keep
+        # their state in memory so they can't rewrite the live journal
+        self.state_journal = StateJournal(None if driver else STATE_JOURNAL_PATH)
+        self.resume_asin = self.state_journal.state["position"]
+
+        if autobuy_config:
+            # Benchmarks bring the ASINs their fixtures serve
+            self.amazon_website = autobuy_config["amazon_website"]
+            self.apply_autobuy_config(autobuy_config)
+        elif os.path.exists(AUTOBUY_CONFIG_PATH):
+            try:
+                self.config_version = get_file_version(AUTOBUY_CONFIG_PATH)
+                config = load_autobuy_config(AUTOBUY_CONFIG_PATH)
+            except (OSError, ValueError) as e:
+                log.error(e)
+                log.error(
+                    "amazon_config.json file not formatted properly: https://github.com/Hari-Nagarajan/fairgame/wiki/Usage#json-configuration"
+                )
+                exit(0)
+            self.amazon_website = config["amazon_website"]
+            self.apply_autobuy_config(config)
         else:
             log.error(
                 "No config file found, see here on how to fix this: https://github.com/Hari-Nagarajan/fairgame/wiki/Usage#json-configuration"
             )
             exit(0)
 
-        if not self.create_driver(self.profile_path):
-            exit(1)
-
         for key in AMAZON_URLS.keys():
             AMAZON_URLS[key] = AMAZON_URLS[key].format(domain=self.amazon_website)
+        # Browserless runs must not skew the baseline with their made up timings
+        self.cart_flow_baseline = (
+            None
+            if self.browserless
+            else load_checkout_baseline(CHECKOUT_BASELINE_PATH, self.amazon_website)
+        )
+
+        # Chrome starts while the credentials are unlocked, which may be waiting on a password
+        browser_stage = None
+        if not driver:
+            browser_stage = start_stage("browser", self.start_browser)
+            try:
+                with timed_stage("credentials"):
+                    amazon_config = global_config.get_amazon_config(encryption_pass)
+            except BaseException:
+                # A wrong password exits and Ctrl-C interrupts, neither may leave Chrome running
+                # with the profile locked
+                self.quit_startup_browser(browser_stage)
+                raise
+        else:
+            # Browserless runs never sign in, so the credentials stay locked
+            amazon_config = global_config.get_amazon_config(credentials=False)
+
+        if driver:
+            # Browserless runs (tests, benchmarks, replays) bring their own driver, such as
+            # utils.fake_webdriver.FakeWebDriver
+            self.driver = driver
+            self.wait = WebDriverWait(self.driver, 10)
+        elif not browser_stage.wait():
+            exit(1)
         if self.alt_offers:
             log.info("Using alternate page for offer parsing.")
             self.ACTIVE_OFFER_URL = AMAZON_URLS["ALT_OFFER_URL"]
         else:
             self.ACTIVE_OFFER_URL = AMAZON_URLS["OFFER_URL"]
+        if self.watch and self.alt_offers:
+            log.warning("Watch mode needs the offer flyout, ignoring --watch")
+            self.watch = False
+        if self.scheduler and (self.watch or self.prefetch):
+            log.warning(
+                "The scheduler checks one ASIN at a time, ignoring --watch/--prefetch"
+            )
+            self.watch = False
+            self.prefetch = False
+        if self.http_probe and (self.watch or self.prefetch):
+            log.warning(
+                "HTTP probes replace browser tab modes, ignoring --watch/--prefetch"
+            )
+            self.watch = False
+            self.prefetch = False
 
     def run(self, delay=DEFAULT_REFRESH_DELAY, test=False):
         self.testing = test
         self.refresh_delay = delay
         self.show_config()
 
-        log.info("Waiting for home page.")
-        while True:
+        cart_quantity = self.validate_session() if self.fast_startup else None
+        if cart_quantity is None:
+            if not self.start_session():
+                return
+        elif cart_quantity > 0:
+            self.exit_on_full_cart(cart_quantity)
+            return
+        else:
+            log.info("Profile is logged in, skipping the home page")
+            self.notification_handler.play_notify_sound()
+            self.send_notification(
+                "Bot Logged in and Starting up", "Start-Up", take_screenshot=False
+            )
+
+        continue_stock_check = True
+
+        # Logged in by now, so the standby gets a profile copy with a valid session
+        self.start_standby_driver()
+        self.resource_watchdog.start()
+        time_to_first_check = time.time() - self.start_time
+        metrics.record_timing("startup.time_to_first_check", time_to_first_check)
+        log.info(f"Checking stock for items, {time_to_first_check:.1f}s after start.")
+
+        while continue_stock_check:
+            self.unknown_title_notification_sent = False
+            asin = self.run_asins(delay)
+            if not asin:
+                log.info(
+                    "Every ASIN group has already been ordered, nothing left to do"
+                )
+                break
+            # found something in stock and under reserve
+            self.atc_confirmed_time = time.time()
+            self.checkout_path = "cart"
+            if self.direct_checkout:
+                self.go_to_direct_checkout()
+            self.run_checkout(asin, test)
+            # if no items left it list, let loop end
+            if not self.asin_list:
+                continue_stock_check = False
+        runtime = time.time() - self.start_time
+        log.info(f"FairGame bot ran for {runtime} seconds.")
+        # Subscribers run on daemon threads, give the last notifications a chance to go out
+        if not self.events.drain(timeout=DEFAULT_EVENT_DRAIN_TIMEOUT):
+            log.debug("Some event subscribers are still busy")
+        if self.recorder:
+            self.recorder.close()
+        if self.check_journal:
+            self.check_journal.close()
+        self.state_journal.close()
+        metrics.log_summary()
+        time.sleep(10)  # add a delay to shut stuff done
+
+    def start_session(self):
+        """Loads the home page in the browser, logging in if needed.  Returns False if the bot
+        should not start"""
+        if self.home_page_preloaded:
+            log.info("Home page was loaded during startup")
+        else:
+            log.info("Waiting for home page.")
+        while not self.home_page_preloaded:
             try:
                 self.get_page(url=AMAZON_URLS["BASE_URL"])
                 break
@@ -224,12 +617,8 @@ class Amazon:
                 pass
         cart_quantity = self.get_cart_count()
         if cart_quantity > 0:
-            log.warning(f"Found {cart_quantity} item(s) in your cart.")
-            log.info("Delete all item(s) in cart before starting bot.")
-            self.driver.get(AMAZON_URLS["CART_URL"])
-            log.info("Exiting in 30 seconds...")
-            time.sleep(30)
-            return
+            self.exit_on_full_cart(cart_quantity)
+            return False
         self.handle_startup()
         if not self.is_logged_in():
             self.login()
@@ -237,58 +626,119 @@ class Amazon:
         self.send_notification(
             "Bot Logged in and Starting up", "Start-Up", self.take_screenshots
         )
-        if self.get_cart_count() > 0:
-            log.warning(f"Found {cart_quantity} item(s) in your cart.")
-            log.info("Delete all item(s) in cart before starting bot.")
-            self.driver.get(AMAZON_URLS["CART_URL"])
-            log.info("Exiting in 30 seconds...")
-            time.sleep(30)
-            return
-
-        continue_stock_check = True
-
-        log.info("Checking stock for items.")
+        cart_quantity = self.get_cart_count()
+        if cart_quantity > 0:
+            self.exit_on_full_cart(cart_quantity)
+            return False
+        return True
 
-        while continue_stock_check:
-            self.unknown_title_notification_sent = False
-            asin = self.run_asins(delay)
-            # found something in stock and under reserve
-            # initialize loop limiter variables
-            self.try_to_checkout = True
-            self.checkout_retry = 0
-            self.order_retry = 0
-            loop_iterations = 0
-            self.great_success = False
-            while self.try_to_checkout:
-                try:
-                    self.navigate_pages(test)
-                # if for some reason page transitions in the middle of checking elements, don't break the program
-                except sel_exceptions.StaleElementReferenceException:
-                    pass
-                # if successful after running navigate pages, remove the asin_list from the list
-                if (
-                    not self.try_to_checkout
-                    and not self.single_shot
-                    and self.great_success
-                ):
+    def exit_on_full_cart(self, cart_quantity):
+        log.warning(f"Found {cart_quantity} item(s) in your cart.")
+        log.info("Delete all item(s) in cart before starting bot.")
+        self.driver.get(AMAZON_URLS["CART_URL"])
+        log.info("Exiting in 30 seconds...")
+        time.sleep(30)
+
+    def validate_session(self):
+        """Checks the profile's login from its cookies and a single HTTP request for the home page,
+        without rendering anything in the browser.  Returns the cart count if the session is
+        valid, or None when the full browser startup is needed"""
+        start_time = time.time()
+        try:
+            cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {})[
+                "cookies"
+            ]
+            user_agent = self.driver.execute_script("return navigator.userAgent;")
+        except sel_exceptions.WebDriverException as e:
+            log.debug(f"Could not read cookies from the browser: {e}")
+            return None
+        domain = get_cookie_domain(self.amazon_website)
+        cookies = [c for c in cookies if c["domain"].lstrip(".").endswith(domain)]
+        if not any(c["name"].startswith(AUTH_COOKIE_PREFIXES) for c in cookies):
+            log.info("No login cookies in the profile")
+            return None
+
+        session = requests.Session()
+        adapter = TimeoutHTTPAdapter(timeout=DEFAULT_PROBE_TIMEOUT, max_retries=0)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = user_agent
+        for cookie in cookies:
+            session.cookies.set_cookie(
+                requests.cookies.create_cookie(
+                    domain=cookie["domain"], name=cookie["name"], value=cookie["value"]
+                )
+            )
+        try:
+            response = session.get(AMAZON_URLS["BASE_URL"])
+            response.raise_for_status()
+            tree = html.fromstring(response.content)
+        except (requests.exceptions.RequestException, etree.ParserError) as e:
+            log.debug(f"Session check request failed: {e}")
+            return None
+        account = tree.xpath("//*[@id='nav-link-accountList']")
+        if not account or any(
+            sign_in in account[0].text_content()
+            for sign_in in amazon_config["SIGN_IN_TEXT"]
+        ):
+            log.info("Profile session has expired")
+            return None
+        cart_count = tree.xpath("//*[@id='nav-cart-count']")
+        try:
+            cart_quantity = int(cart_count[0].text_content().strip())
+        except (IndexError, ValueError):
+            return None
+        # Already seeded with this browser's cookies, so HTTP probes can start with it
+        self.probe_session = session
+        self.probe_session_time = time.time()
+        metrics.record_timing("startup.session_check", time.time() - start_time)
+        return cart_quantity
+
+    def run_checkout(self, asin, test):
+        """Drives checkout as a state machine, one page (state) per step.  Retry limits and
+        deadlines live in the machine instead of counters in the handlers"""
+        self.try_to_checkout = True
+        self.great_success = False
+        self.checkout_machine = StateMachine(
+            "checkout",
+            CheckoutState.ADD_TO_CART,
+            deadlines=CHECKOUT_STATE_DEADLINES,
+            retry_limits=CHECKOUT_STATE_RETRY_LIMITS,
+            max_steps=DEFAULT_MAX_CHECKOUT_LOOPS,
+        )
+        # The machine starts when the item was carted, not when checkout started looking
+        self.checkout_machine.entered = self.atc_confirmed_time or time.time()
+        group = next((asins for asins in self.asin_list if asin in asins), [asin])
+        if not test:
+            self.state_journal.checkout_started(asin)
+        while self.try_to_checkout:
+            try:
+                self.navigate_pages(test)
+            # if for some reason page transitions in the middle of checking elements, don't break the program
+            except sel_exceptions.StaleElementReferenceException:
+                pass
+            # if successful after running navigate pages, remove the asin_list from the list
+            if not self.try_to_checkout:
+                if not self.single_shot and self.great_success:
                     self.remove_asin_list(asin)
-                # checkout loop limiters
-                elif self.checkout_retry > DEFAULT_MAX_PTC_TRIES:
-                    self.try_to_checkout = False
-                    self.fail_to_checkout_note()
-                elif self.order_retry > DEFAULT_MAX_PYO_TRIES:
-                    self.try_to_checkout = False
-                    self.fail_to_checkout_note()
-                loop_iterations += 1
-                if loop_iterations > DEFAULT_MAX_CHECKOUT_LOOPS:
-                    self.fail_to_checkout_note()
-                    self.try_to_checkout = False
-            # if no items left it list, let loop end
-            if not self.asin_list:
-                continue_stock_check = False
-        runtime = time.time() - self.start_time
-        log.info(f"FairGame bot ran for {runtime} seconds.")
-        time.sleep(10)  # add a delay to shut stuff done
+                break
+            reason = self.checkout_machine.over_limit()
+            if reason:
+                log.info(f"Giving up on checkout: {reason}")
+                self.try_to_checkout = False
+                self.fail_to_checkout_note()
+        self.checkout_machine.finish(
+            CheckoutState.DONE if self.great_success else CheckoutState.FAILED
+        )
+        self.checkout_machine = None
+        if not test:
+            self.state_journal.checkout_finished(
+                asin, group if self.great_success else None
+            )
+
+    def retry_checkout_state(self):
+        """Counts a failed attempt on the current checkout page against its retry limit"""
+        if self.checkout_machine:
+            self.checkout_machine.retry()
 
     def fail_to_checkout_note(self):
         log.info(
@@ -428,24 +878,589 @@ class Amazon:
 
     @debug
     def run_asins(self, delay):
-        found_asin = False
-        while not found_asin:
-            for i in range(len(self.asin_list)):
-                for asin in self.asin_list[i]:
-                    # start_time = time.time()
-                    if self.log_stock_check:
-                        log.info(f"Checking ASIN: {asin}.")
-                    if self.check_stock(asin, self.reserve_min[i], self.reserve_max[i]):
-                        return asin
-                    # log.info(f"check time took {time.time()-start_time} seconds")
-                    time.sleep(delay)
+        """Checks stock until an ASIN is found.  The check loops return None when the autobuy
+        config was reloaded, so they start over on the new ASINs"""
+        while True:
+            if not self.asin_list:
+                return None
+            if self.scheduler:
+                asin = self.run_asins_scheduled(delay)
+            elif self.watch:
+                asin = self.run_asins_watch(delay)
+            elif self.prefetch:
+                asin = self.run_asins_pipelined(delay)
+            else:
+                asin = self.run_asins_serial(delay)
+            if asin:
+                return asin
+
+    def run_asins_serial(self, delay):
+        checks = [
+            (asin, i) for i in range(len(self.asin_list)) for asin in self.asin_list[i]
+        ]
+        idx = self.get_resume_index(checks)
+        while True:
+            asin, group = checks[idx]
+            # start_time = time.time()
+            if self.log_stock_check:
+                log.info(f"Checking ASIN: {asin}.")
+            if self.check_asin(asin, self.reserve_min[group], self.reserve_max[group]):
+                return asin
+            self.state_journal.checked(asin)
+            # log.info(f"check time took {time.time()-start_time} seconds")
+            time.sleep(delay)
+            if self.reload_config_if_changed():
+                return None
+            idx = (idx + 1) % len(checks)
+
+    def get_resume_index(self, checks):
+        """Where the check cycle left off before a restart, only used for the first cycle"""
+        asin, self.resume_asin = self.resume_asin, None
+        for idx, (checked, _) in enumerate(checks):
+            if checked == asin:
+                log.info(f"Resuming the check cycle after {asin}")
+                return (idx + 1) % len(checks)
+        return 0
+
+    def reload_config_if_changed(self):
+        """Picks up edits to amazon_config.json between checks.  The new ASINs and reserves are
+        swapped in all at once, and an edit that doesn't load is ignored until the file changes
+        again.  Returns True if the config was replaced"""
+        now = time.time()
+        if now - self.config_checked < DEFAULT_CONFIG_POLL_INTERVAL:
+            return False
+        self.config_checked = now
+        try:
+            config_version = get_file_version(AUTOBUY_CONFIG_PATH)
+        except OSError:
+            # Editors can remove the file for a moment while saving
+            return False
+        if config_version == self.config_version:
+            return False
+        self.config_version = config_version
+        try:
+            config = load_autobuy_config(AUTOBUY_CONFIG_PATH)
+        except (OSError, ValueError) as e:
+            log.warning(f"Ignoring the edit to {AUTOBUY_CONFIG_PATH}: {e}")
+            return False
+        if config["amazon_website"] != self.amazon_website:
+            log.warning(
+                f"Changing amazon_website needs a restart, still using {self.amazon_website}"
+            )
+        self.apply_autobuy_config(config)
+        asin_count = sum(len(asins) for asins in self.asin_list)
+        log.info(
+            f"Reloaded {AUTOBUY_CONFIG_PATH}: {asin_count} ASINs in {len(self.asin_list)} group(s)"
+        )
+        metrics.record_event("config.reload")
+        return True
+
+    def apply_autobuy_config(self, config):
+        groups = []
+        for group in zip(
+            config["asin_list"],
+            config["reserve_min"],
+            config["reserve_max"],
+            config["priorities"],
+            config["check_intervals"],
+        ):
+            asins = group[0]
+            if self.state_journal.is_done(asins):
+                log.info(f"Skipping {', '.join(asins)}, this group was already ordered")
+                continue
+            in_flight = self.state_journal.in_flight(asins)
+            if in_flight:
+                # Can't tell if the order went through, buying twice is worse than missing out
+                log.warning(
+                    f"FairGame stopped in the middle of checking out {', '.join(in_flight)}. "
+                    f"Skipping its group, check your orders and use --clean-state to hunt it again"
+                )
+                continue
+            groups.append(group)
+        (
+            self.asin_list,
+            self.reserve_min,
+            self.reserve_max,
+            self.priorities,
+            self.check_intervals,
+        ) = (
+            [list(column) for column in zip(*groups)]
+            if groups
+            else [[] for _ in range(5)]
+        )
 
     @debug
-    def check_stock(self, asin, reserve_min, reserve_max, retry=0):
-        if retry > DEFAULT_MAX_ATC_TRIES:
-            log.info("max add to cart retries hit, returning to asin check")
+    def run_asins_scheduled(self, delay):
+        """Checks ASINs as they come due instead of in a fixed order.  Requests are still spaced
+        by the configured delay, priority ASINs go first and failing ASINs back off"""
+        poll_scheduler = self.build_poll_scheduler(delay)
+        while True:
+            item, wait = poll_scheduler.next_item()
+            if wait:
+                time.sleep(wait)
+            poll_scheduler.start(item)
+            group = item.payload
+            if self.log_stock_check:
+                log.info(f"Checking ASIN: {item.key}.")
+            if self.check_asin(
+                item.key, self.reserve_min[group], self.reserve_max[group]
+            ):
+                return item.key
+            interval = poll_scheduler.complete(item, success=not self.check_failed())
+            if item.failures:
+                log.debug(
+                    f"{item.key} failed {item.failures} time(s) in a row, next check in {interval:.1f} seconds"
+                )
+            if self.reload_config_if_changed():
+                return None
+
+    def build_poll_scheduler(self, delay):
+        asin_count = sum(len(asins) for asins in self.asin_list)
+        poll_scheduler = PollScheduler(min_spacing=delay)
+        for group, asins in enumerate(self.asin_list):
+            # Without an explicit interval each ASIN gets the same turn it would in a round robin
+            interval = self.check_intervals[group] or delay * asin_count
+            for asin in asins:
+                poll_scheduler.add(
+                    ScheduledItem(
+                        asin,
+                        interval=interval,
+                        priority=self.priorities[group],
+                        payload=group,
+                    )
+                )
+        return poll_scheduler
+
+    def wait_for_stock_check_breaker(self):
+        """Holds off checking while Amazon keeps serving errors, dogs and robot checks"""
+        wait = self.stock_check_breaker.wait_time()
+        if wait:
+            log.info(f"Stock checks are paused for another {wait:.0f} seconds")
+            time.sleep(wait)
+            self.stock_check_breaker.wait_time()
+
+    def record_stock_check_health(self):
+        if self.stock_check_breaker.record(success=not self.check_failed()):
+            metrics.record_event("stock_check.breaker_open")
+
+    def check_asin(self, asin, reserve_min, reserve_max):
+        """Checks stock behind the circuit breaker"""
+        self.recycle_driver_if_requested()
+        self.wait_for_stock_check_breaker()
+        found = self.probe_or_check_stock(asin, reserve_min, reserve_max)
+        self.record_stock_check_health()
+        return found
+
+    def probe_or_check_stock(self, asin, reserve_min, reserve_max):
+        """Checks stock with an HTTP probe if enabled, and only involves the browser once there is
+        something to buy or the probe saw something it didn't expect"""
+        if not self.http_probe:
+            with metrics.timer("stock_check.browser", asin=asin):
+                found = self.check_stock(asin, reserve_min, reserve_max)
+            if not found:
+                self.record_page_weight("offer")
+                self.collect_page_telemetry("offer")
+            return found
+
+        start_time = time.time()
+        start_cpu = time.process_time()
+        self.start_check(asin, reserve_min, reserve_max)
+        offering_id = self.probe_stock(asin, reserve_min, reserve_max)
+        metrics.record_timing("stock_check.http", time.time() - start_time, asin=asin)
+        metrics.record_timing("stock_check.http_cpu", time.process_time() - start_cpu)
+        if offering_id is False:
+            return self.stock_check_result(
+                StockCheckOutcome.OVER_RESERVE
+                if self.check_details.get("offers")
+                else StockCheckOutcome.NO_OFFERS
+            )
+        if offering_id is None:
+            metrics.increment("stock_check.http_fallback")
+            with metrics.timer("stock_check.browser", asin=asin):
+                return self.check_stock(asin, reserve_min, reserve_max)
+
+        log.info(
+            f"HTTP probe found a qualifying offer for {asin}, handing off to browser"
+        )
+        # The browser will have moved on, so the probe session gets fresh cookies afterwards
+        self.probe_session = None
+        if self.attempt_atc(offering_id, max_atc_retries=DEFAULT_MAX_ATC_TRIES):
+            self.publish_event(AddedToCart(asin))
+            return self.stock_check_result(StockCheckOutcome.IN_STOCK)
+        log.info("Add to cart from the probed offer failed, checking in the browser")
+        return self.check_stock(asin, reserve_min, reserve_max)
+
+    def record_page_weight(self, page_type):
+        """Records how many bytes and requests the current page has cost so far"""
+        try:
+            weight = self.driver.execute_script(PAGE_WEIGHT_JS)
+        except sel_exceptions.WebDriverException:
+            return
+        if not weight:
+            return
+        lean = bool(self.lean_switches or self.lean_blocked_urls)
+        metrics.record_sample(
+            f"page.{page_type}.bytes", weight["bytes"], unit="B", lean=lean
+        )
+        metrics.record_sample(
+            f"page.{page_type}.requests", weight["requests"], lean=lean
+        )
+
+    def collect_page_telemetry(self, page_type):
+        """Records CDP performance metrics and network use since the last collection against the
+        given page type"""
+        if not self.page_telemetry:
+            return
+        try:
+            performance = parse_performance_metrics(
+                self.driver.execute_cdp_cmd("Performance.getMetrics", {})
+            )
+            # Reading the log empties it, so the other tabs' traffic is dropped with it
+            network = summarize_network_log(
+                self.driver.get_log("performance"), self.current_target_id()
+            )
+        except sel_exceptions.WebDriverException as e:
+            log.debug(f"Could not collect telemetry: {e}")
+            return
+        self.page_telemetry.record(page_type, performance=performance, network=network)
+
+    def send_telemetry_alert(self, message):
+        self.send_notification(
+            message=message, page_name="telemetry-regression", take_screenshot=False
+        )
+
+    def get_probe_session(self):
+        """Returns a pooled requests session carrying the logged in browser's cookies"""
+        if (
+            self.probe_session
+            and time.time() - self.probe_session_time < DEFAULT_PROBE_SESSION_AGE
+        ):
+            return self.probe_session
+        session = requests.Session()
+        adapter = TimeoutHTTPAdapter(timeout=DEFAULT_PROBE_TIMEOUT, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        try:
+            session.headers["User-Agent"] = self.driver.execute_script(
+                "return navigator.userAgent;"
+            )
+            add_cookies_to_session_from_driver(self.driver, session)
+        except sel_exceptions.WebDriverException as e:
+            log.debug(f"Could not seed probe session from browser: {e}")
+            return None
+        self.probe_session = session
+        self.probe_session_time = time.time()
+        return session
+
+    def probe_stock(self, asin, reserve_min, reserve_max):
+        """Fetches the offers fragment over HTTP and evaluates it with lxml.  Returns the offering
+        ID of a qualifying offer, False if nothing qualifies and None on anything unexpected
+        """
+        session = self.get_probe_session()
+        if not session:
+            return None
+        try:
+            response = session.get(AMAZON_URLS["AOD_URL"] + asin)
+        except requests.RequestException as e:
+            log.debug(f"HTTP probe for {asin} failed: {e}")
+            return None
+        if response.status_code != 200:
+            log.debug(f"HTTP probe for {asin} returned {response.status_code}")
+            return None
+        try:
+            tree = html.fromstring(response.content)
+        except Exception as e:
+            log.debug(f"HTTP probe for {asin} could not be parsed: {e}")
+            return None
+        if tree.xpath("//form[contains(@action,'validateCaptcha')]") or tree.xpath(
+            "//img[@alt='Dogs of Amazon']"
+        ):
+            log.debug(f"HTTP probe for {asin} hit a captcha or error page")
+            return None
+        if not tree.xpath(
+            "//*[@id='aod-container' or @id='aod-offer-list' or @id='aod-pinned-offer']"
+        ):
+            log.debug(f"HTTP probe for {asin} did not find the offer list")
+            return None
+
+        offers = parse_aod_offers(tree)
+        self.check_details["offers"] = len(offers)
+        if self.log_stock_check:
+            log.info(f"HTTP probe found {len(offers)} offers for {asin}")
+        for offer in offers:
+            if offer["price"].amount is None:
+                continue
+            shipping = offer["shipping"].amount or 0
+            if not self.checkshipping and shipping > 0:
+                continue
+            if offer["condition"].value > self.condition.value:
+                continue
+            self.note_offer(offer["price"].amount, shipping, offer["condition"].name)
+            if in_reserve_range(
+                offer["price"].amount + shipping, reserve_min, reserve_max
+            ):
+                if not offer["offering_id"]:
+                    # Can't hand this one off directly, let the browser sort it out
+                    return None
+                log.info(
+                    f"Item in stock and in reserve range: {offer['price'].amount} + {shipping} shipping"
+                )
+                return offer["offering_id"]
+        return False
+
+    @debug
+    def run_asins_pipelined(self, delay):
+        """Same checks and request cadence as run_asins, but the next ASIN's offer page loads in a
+        second tab while the current one is evaluated, hiding the render time behind the evaluation
+        """
+        checks = [
+            (asin, i) for i in range(len(self.asin_list)) for asin in self.asin_list[i]
+        ]
+        if not self.open_prefetch_tab():
+            log.warning("Could not open a prefetch tab, checking stock serially")
+            self.prefetch = False
+            return self.run_asins(delay)
+
+        idx = self.get_resume_index(checks)
+        prefetched = False
+        last_request = 0
+        while True:
+            asin, group = checks[idx]
+            next_idx = (idx + 1) % len(checks)
+            if not prefetched:
+                # Nothing waiting in this tab, so load it the normal way
+                if self.log_stock_check:
+                    log.info(f"Loading ASIN: {asin}.")
+                if not self.load_offer_page(self.get_offer_url(asin)):
+                    # Driver was recreated, so the tabs are gone
+                    if not self.open_prefetch_tab():
+                        self.prefetch = False
+                        return self.run_asins(delay)
+                    continue
+                last_request = time.time()
+
+            if self.recycle_driver_if_requested():
+                # A fresh browser has no tabs, so start the pipeline over
+                if not self.open_prefetch_tab():
+                    self.prefetch = False
+                    return self.run_asins(delay)
+                prefetched = False
+                continue
+            # Keep the request rate at the configured cadence
+            time.sleep(max(0.0, delay - (time.time() - last_request)))
+            self.wait_for_stock_check_breaker()
+            prefetched = self.prefetch_offer_page(checks[next_idx][0])
+            last_request = time.time()
+
+            if self.log_stock_check:
+                log.info(f"Checking ASIN: {asin}.")
+            if self.check_stock(
+                asin, self.reserve_min[group], self.reserve_max[group], prefetched=True
+            ):
+                # We are already on the checkout tab, let checkout take it from here
+                return asin
+            self.record_stock_check_health()
+            self.state_journal.checked(asin)
+
+            # The tab that was prefetching becomes the one we evaluate next
+            try:
+                self.swap_prefetch_tab()
+            except sel_exceptions.WebDriverException:
+                # The driver was recreated during the check, so start the pipeline over
+                if not self.open_prefetch_tab():
+                    self.prefetch = False
+                    return self.run_asins(delay)
+                prefetched = False
+            idx = next_idx
+            if self.reload_config_if_changed():
+                # What's prefetching may not be wanted anymore, the next round reloads anyway
+                return None
+
+    @debug
+    def run_asins_watch(self, delay):
+        """Keeps a tab open per ASIN and refreshes only the offers in place at the configured cadence.
+        Full offer evaluation only runs when the offers actually changed"""
+        watched = [
+            (asin, i) for i in range(len(self.asin_list)) for asin in self.asin_list[i]
+        ]
+        while True:
+            if not self.watch_tabs and not self.open_watch_tabs(watched):
+                log.warning("Could not set up watch tabs, checking stock normally")
+                self.watch = False
+                return self.run_asins(delay)
+            if self.recycle_driver_if_requested():
+                continue
+            for asin, group in watched:
+                self.wait_for_stock_check_breaker()
+                start_time = time.time()
+                if self.log_stock_check:
+                    log.info(f"Watching ASIN: {asin}.")
+                try:
+                    self.driver.switch_to.window(self.watch_tabs[(asin, group)])
+                    changed = self.refresh_watch_tab(asin)
+                except sel_exceptions.WebDriverException as e:
+                    # Tabs are gone, most likely because the driver was recreated
+                    log.debug(e)
+                    self.watch_tabs = {}
+                    break
+                if changed is None:
+                    # Something is off with the fragment, fall back to a full page check
+                    found = self.check_stock(
+                        asin, self.reserve_min[group], self.reserve_max[group]
+                    )
+                    self.install_watch(asin)
+                elif changed:
+                    found = self.check_stock(
+                        asin,
+                        self.reserve_min[group],
+                        self.reserve_max[group],
+                        prefetched=True,
+                    )
+                else:
+                    self.start_check(
+                        asin, self.reserve_min[group], self.reserve_max[group]
+                    )
+                    self.check_started = start_time
+                    found = self.stock_check_result(StockCheckOutcome.UNCHANGED)
+                if found:
+                    return asin
+                self.record_stock_check_health()
+                time.sleep(max(0.0, delay - (time.time() - start_time)))
+                if self.reload_config_if_changed():
+                    self.close_watch_tabs()
+                    return None
+
+    def open_watch_tabs(self, watched):
+        """Opens and loads a tab for every watched (ASIN, group), reusing the current tab for the
+        first.  Starts over, after a pause, when the driver had to be recreated"""
+        for attempt in range(DEFAULT_MAX_WATCH_SETUP_TRIES):
+            if attempt:
+                time.sleep(DEFAULT_WATCH_SETUP_BACKOFF * attempt)
+            opened = self.try_open_watch_tabs(watched)
+            if opened is not None:
+                return opened
+        log.warning(f"Offer pages kept failing to load in {attempt + 1} tries")
+        return False
+
+    def try_open_watch_tabs(self, watched):
+        """Returns whether the tabs are open, or None if the driver was recreated meanwhile"""
+        self.watch_tabs = {}
+        self.driver.set_script_timeout(DEFAULT_MAX_TIMEOUT)
+        for asin, group in watched:
+            try:
+                if self.watch_tabs and not self.open_tab():
+                    return False
+                self.watch_tabs[(asin, group)] = self.driver.current_window_handle
+            except sel_exceptions.WebDriverException as e:
+                log.debug(e)
+                return False
+            if not self.load_offer_page(self.get_offer_url(asin)):
+                # Driver was recreated, start over with the new one
+                return None
+            self.install_watch(asin)
+        return True
+
+    def install_watch(self, asin):
+        try:
+            WebDriverWait(self.driver, timeout=DEFAULT_MAX_TIMEOUT).until(
+                lambda d: d.find_elements_by_xpath("//div[@id='aod-container']")
+            )
+            installed = self.driver.execute_script(WATCH_INSTALL_JS)
+        except sel_exceptions.WebDriverException:
+            installed = False
+        if not installed:
+            log.debug(f"No offer container to watch for {asin}, will use full checks")
+        return installed
+
+    def refresh_watch_tab(self, asin):
+        """Refreshes the offers fragment in the current tab.  Returns True if the offers changed,
+        False if they didn't and None if the refresh didn't work"""
+        try:
+            result = self.driver.execute_async_script(
+                WATCH_REFRESH_JS, AMAZON_URLS["AOD_URL"] + asin
+            )
+        except sel_exceptions.TimeoutException:
+            result = {"error": "timed out"}
+        if not result or result.get("error"):
+            log.debug(
+                f"Offer refresh for {asin} failed: {result and result.get('error')}"
+            )
+            metrics.increment("watch.refresh_failures")
+            return None
+        metrics.record_sample("watch.bytes", result["bytes"], unit="B", asin=asin)
+        if result["changed"] and result["changedAt"]:
+            metrics.record_timing(
+                "watch.detection_latency",
+                max(0.0, time.time() - result["changedAt"] / 1000),
+                asin=asin,
+            )
+        return result["changed"]
+
+    def close_watch_tabs(self):
+        """Closes the watch tabs except one, which is left for the next checks to reuse"""
+        handles = list(self.watch_tabs.values())
+        self.watch_tabs = {}
+        try:
+            for handle in handles[1:]:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            if handles:
+                self.driver.switch_to.window(handles[0])
+        except sel_exceptions.WebDriverException as e:
+            log.debug(e)
+
+    def open_prefetch_tab(self):
+        """Opens (or reuses) a second browser tab for loading the next offer page"""
+        try:
+            handles = self.driver.window_handles
+            self.check_tab = self.driver.current_window_handle
+            if self.prefetch_tab in handles and self.prefetch_tab != self.check_tab:
+                return True
+            handle = self.open_tab()
+            self.driver.switch_to.window(self.check_tab)
+        except sel_exceptions.WebDriverException as e:
+            log.debug(e)
+            return False
+        if not handle:
             return False
+        self.prefetch_tab = handle
+        return True
 
+    def open_tab(self):
+        """Opens a blank tab and switches to it.  Returns its handle, None if no tab showed up"""
+        handles = self.driver.window_handles
+        self.driver.execute_script("window.open('about:blank', '_blank');")
+        new_handles = [h for h in self.driver.window_handles if h not in handles]
+        if not new_handles:
+            return None
+        self.driver.switch_to.window(new_handles[0])
+        # DevTools settings, such as the blocked URLs, only apply to the tab they were sent to
+        self.block_unneeded_urls(self.driver)
+        return new_handles[0]
+
+    def prefetch_offer_page(self, asin):
+        """Starts loading the offer page in the prefetch tab without waiting for it"""
+        try:
+            self.driver.switch_to.window(self.prefetch_tab)
+            # Setting the location returns immediately regardless of the page load strategy
+            self.driver.execute_script(
+                "window.location.href = arguments[0];", self.get_offer_url(asin)
+            )
+            return True
+        except sel_exceptions.WebDriverException as e:
+            log.debug(f"Prefetch of {asin} failed: {e}")
+            return False
+        finally:
+            try:
+                self.driver.switch_to.window(self.check_tab)
+            except sel_exceptions.WebDriverException:
+                pass
+
+    def swap_prefetch_tab(self):
+        self.check_tab, self.prefetch_tab = self.prefetch_tab, self.check_tab
+        self.driver.switch_to.window(self.check_tab)
+
+    def get_offer_url(self, asin):
         if self.alt_offers:
             if self.checkshipping:
                 if self.used:
@@ -464,16 +1479,22 @@ class Amazon:
         else:
             # Force the flyout by default
             f = furl(self.ACTIVE_OFFER_URL + asin + "?aod=1")
-        fail_counter = 0
-        presence.searching_update()
+        return f.url
 
+    def load_offer_page(self, url):
+        """Loads the offer page, recreating the driver if it keeps failing.  Returns False if the
+        driver had to be recreated and the stock check should be skipped"""
+        fail_counter = 0
         # handles initial page load only
         while True:
             try:
-                self.get_page(f.url)
+                self.open_page(url)
+                if self.recorder:
+                    self.recorder.record("navigation", url=url, title=self.driver.title)
                 log.debug(f"Initial page title {self.driver.title}")
                 log.debug(f"        page url: {self.driver.current_url}")
                 if self.driver.title in amazon_config["CAPTCHA_PAGE_TITLES"]:
+                    self.captcha_seen = True
                     self.handle_captcha()
                 break
             except Exception:
@@ -485,32 +1506,135 @@ class Amazon:
                     )
                     time.sleep(3)
                 else:
-                    log.info(
-                        "Attempting to delete and recreate current chrome instance"
-                    )
-                    if not self.delete_driver():
-                        log.error("Failed to delete chrome processes")
-                        log.error("Please restart bot")
-                        self.send_notification(
-                            message="Bot Failed, please restart bot",
-                            page_name="Bot Failed",
-                            take_screenshot=False,
-                        )
-                        raise RuntimeError("Failed to restart bot")
-                    elif not self.create_driver(self.profile_path):
-                        log.error("Failed to recreate webdriver processes")
-                        log.error("Please restart bot")
-                        self.send_notification(
-                            message="Bot Failed, please restart bot",
-                            page_name="Bot Failed",
-                            take_screenshot=False,
-                        )
-                        raise RuntimeError("Failed to restart bot")
-                    else:  # deleted driver and recreated it succesfully
-                        log.info(
-                            "WebDriver recreated successfully. Returning back to stock check"
-                        )
-                        return False
+                    self.restart_driver()
+                    log.info("Returning back to stock check")
+                    return False
+        return True
+
+    def open_page(self, url):
+        """Loads a page through the DevTools engine when enabled, falling back to the WebDriver"""
+        if self.cdp_engine:
+            start_time = time.time()
+            try:
+                page = self.get_cdp_page()
+                self.cdp_engine.run(page.navigate(url), timeout=DEFAULT_MAX_TIMEOUT)
+                metrics.record_timing("page_load.cdp", time.time() - start_time)
+                return True
+            except Exception as e:
+                log.debug(f"DevTools page load failed, using WebDriver: {e}")
+                metrics.increment("page_load.cdp_fallback")
+                self.close_cdp_page()
+        return self.get_page(url)
+
+    def get_cdp_page(self):
+        """DevTools session for the tab the WebDriver is on, reattaching after tab switches or a
+        new browser"""
+        target_id = self.current_target_id()
+        if (
+            self.cdp_page
+            and self.cdp_page.target_id == target_id
+            and not self.cdp_page.connection.closed
+        ):
+            return self.cdp_page
+        self.close_cdp_page()
+        debugger_address = self.driver.capabilities["goog:chromeOptions"][
+            "debuggerAddress"
+        ]
+        self.cdp_page = self.cdp_engine.run(
+            attach_to_page(debugger_address, target_id), timeout=DEFAULT_MAX_TIMEOUT
+        )
+        return self.cdp_page
+
+    def current_target_id(self):
+        # Chrome window handles are DevTools target IDs, older drivers add a prefix
+        return self.driver.current_window_handle.replace("CDwindow-", "")
+
+    def close_cdp_page(self):
+        if self.cdp_page:
+            self.cdp_engine.submit(self.cdp_page.connection.close())
+            self.cdp_page = None
+
+    def restart_driver(self):
+        """Replaces the browser, with the standby if one is ready.  Raises RuntimeError if a new
+        browser could not be started"""
+        metrics.record_event("driver.restart")
+        if self.swap_to_standby_driver():
+            log.info("Switched to the standby browser")
+            return
+        log.info("Attempting to delete and recreate current chrome instance")
+        if not self.delete_driver():
+            log.error("Failed to delete chrome processes")
+            log.error("Please restart bot")
+            self.send_notification(
+                message="Bot Failed, please restart bot",
+                page_name="Bot Failed",
+                take_screenshot=False,
+            )
+            raise RuntimeError("Failed to restart bot")
+        elif not self.create_driver(self.active_profile_path):
+            log.error("Failed to recreate webdriver processes")
+            log.error("Please restart bot")
+            self.send_notification(
+                message="Bot Failed, please restart bot",
+                page_name="Bot Failed",
+                take_screenshot=False,
+            )
+            raise RuntimeError("Failed to restart bot")
+        # deleted driver and recreated it succesfully
+        self.check_tab = self.prefetch_tab = None
+        self.watch_tabs = {}
+        self.probe_session = None
+        log.info("WebDriver recreated successfully")
+
+    def recycle_driver_if_requested(self):
+        """Restarts the browser if the resource watchdog asked for it.  Only called between stock
+        checks, so a recycle never interrupts a checkout.  Returns True if the browser was replaced
+        """
+        self.check_pinned_endpoint()
+        reason = self.resource_watchdog.take_recycle_request()
+        if not reason:
+            return False
+        log.info(f"Recycling the browser: {reason}")
+        start_time = time.time()
+        if self.pin_changed:
+            # The standby was launched with the old resolver rule
+            self.pin_changed = False
+            self.discard_standby_driver()
+            self.restart_driver()
+            self.start_standby_driver()
+        else:
+            self.restart_driver()
+        metrics.record_timing("driver.recycle", time.time() - start_time)
+        metrics.record_event("driver.recycle")
+        return True
+
+    def start_check(self, asin, reserve_min, reserve_max):
+        """Resets what is known about the check in progress, every way of checking stock starts
+        with this and ends with stock_check_result"""
+        self.check_outcome = None
+        self.captcha_seen = False
+        self.checking = (asin, reserve_min, reserve_max)
+        self.check_started = time.time()
+        self.check_details = {}
+
+    @debug
+    def check_stock(self, asin, reserve_min, reserve_max, retry=0, prefetched=False):
+        self.start_check(asin, reserve_min, reserve_max)
+        if retry > DEFAULT_MAX_ATC_TRIES:
+            log.info("max add to cart retries hit, returning to asin check")
+            return self.stock_check_result(StockCheckOutcome.ATC_FAILED)
+
+        presence.searching_update()
+        if prefetched:
+            # The offer page was already requested in this tab, just make sure it isn't a captcha
+            if self.driver.title in amazon_config["CAPTCHA_PAGE_TITLES"]:
+                self.captcha_seen = True
+                self.handle_captcha()
+            if not self.wait_for_offer_page(asin):
+                log.debug(f"Prefetched page for {asin} never showed up, loading it")
+                prefetched = False
+        if not prefetched and not self.load_offer_page(self.get_offer_url(asin)):
+            return self.stock_check_result(StockCheckOutcome.LOAD_FAILURE)
 
         timeout = self.get_timeout()
         atc_buttons = None
@@ -527,7 +1651,7 @@ class Amazon:
                 )
                 if footer and footer[0].tag_name == "img":
                     log.info(f"Saw dogs for {asin}.  Skipping...")
-                    return False
+                    return self.stock_check_result(StockCheckOutcome.DOGS)
 
                 log.debug(f"After footer page title {self.driver.title}")
                 log.debug(f"             page url: {self.driver.current_url}")
@@ -541,12 +1665,14 @@ class Amazon:
                         "//input[@name='submit.add-to-cart' and not(//span[@data-action='show-all-offers-display'])]"
                     )
                 )
+                if self.recorder:
+                    self.record_offer_snapshot(asin)
                 offer_count = []
                 offer_id = offers.get_attribute("id")
                 if offer_id == "outOfStock" or offer_id == "backInStock":
                     # No dice... Early out and move on
                     log.info("Item is currently unavailable.  Moving on...")
-                    return False
+                    return self.stock_check_result(StockCheckOutcome.NO_OFFERS)
 
                 if offer_id == "olpOfferList":
                     # Offers Page ... count the 'a-row' classes to know how many offers we 'see'
@@ -646,10 +1772,10 @@ class Amazon:
                     for attr in attrs:
                         log.warning(f"{attr} = {attrs[attr]}")
 
-                    return False
+                    return self.stock_check_result(StockCheckOutcome.ERROR)
                 if len(offer_count) == 0:
                     log.info("No offers found.  Moving on.")
-                    return False
+                    return self.stock_check_result(StockCheckOutcome.NO_OFFERS)
                 log.info(
                     f"Found {len(offer_count)} offers for {asin}.  Evaluating offers..."
                 )
@@ -658,10 +1784,10 @@ class Amazon:
                 log.error("Timed out waiting for offers to render.  Skipping...")
                 log.error(f"URL: {self.driver.current_url}")
                 log.exception(te)
-                return False
+                return self.stock_check_result(StockCheckOutcome.TIMEOUT)
             except sel_exceptions.NoSuchElementException:
                 log.error("Unable to find any offers listing.  Skipping...")
-                return False
+                return self.stock_check_result(StockCheckOutcome.ERROR)
             except sel_exceptions.ElementClickInterceptedException as e:
                 log.debug(
                     "Covering element detected... Assuming it's a slow flyout... scanning document again..."
@@ -696,10 +1822,23 @@ class Amazon:
                 pass
 
             if test and (test.text in amazon_config["NO_SELLERS"]):
-                return False
+                return self.stock_check_result(StockCheckOutcome.NO_OFFERS)
             if time.time() > timeout:
                 log.info(f"failed to load page for {asin}, going to next ASIN")
-                return False
+                return self.stock_check_result(StockCheckOutcome.TIMEOUT)
+
+        offer_hash = self.get_offer_hash()
+        if offer_hash and self.unchanged_offers.get(asin) == (
+            offer_hash,
+            reserve_min,
+            reserve_max,
+        ):
+            log.debug(f"Offers for {asin} have not changed, skipping evaluation")
+            self.record_offer_hash_result(short_circuit=True)
+            return self.stock_check_result(StockCheckOutcome.UNCHANGED)
+        if offer_hash:
+            self.record_offer_hash_result(short_circuit=False)
+        self.unchanged_offers.pop(asin, None)
 
         timeout = self.get_timeout()
         flyout_mode = False
@@ -719,7 +1858,8 @@ class Amazon:
                 break
             if time.time() > timeout:
                 log.info(f"failed to load prices for {asin}, going to next ASIN")
-                return False
+                return self.stock_check_result(StockCheckOutcome.TIMEOUT)
+        self.check_details["offers"] = len(prices)
         shipping = []
         shipping_prices = []
 
@@ -758,9 +1898,10 @@ class Amazon:
 
             if time.time() > timeout:
                 log.info(f"failed to load shipping for {asin}, going to next ASIN")
-                return False
+                return self.stock_check_result(StockCheckOutcome.TIMEOUT)
 
         in_stock = False
+        atc_attempted = False
         for shipping_price in shipping_prices:
             log.debug(f"\tShipping Price: {shipping_price}")
 
@@ -794,29 +1935,29 @@ class Amazon:
                     price = parse_price(prices[idx].text)
             except IndexError:
                 log.debug("Price index error")
-                return False
+                return self.stock_check_result(StockCheckOutcome.ERROR)
             # Include the price, even if it's zero for comparison
             ship_price = shipping_prices[idx]
             ship_float = ship_price.amount
             price_float = price.amount
             if price_float is None:
-                return False
+                return self.stock_check_result(StockCheckOutcome.ERROR)
             if ship_float is None:
                 ship_float = 0
+            self.note_offer(
+                price_float,
+                ship_float,
+                seller_item_condition.name if flyout_mode and condition else None,
+            )
 
-            if (
-                (ship_float + price_float) <= reserve_max
-                or math.isclose((price_float + ship_float), reserve_max, abs_tol=0.01)
-            ) and (
-                (ship_float + price_float) >= reserve_min
-                or math.isclose((price_float + ship_float), reserve_min, abs_tol=0.01)
-            ):
+            if in_reserve_range(price_float + ship_float, reserve_min, reserve_max):
                 log.info("Item in stock and in reserve range!")
                 log.info(f"{price_float} + {ship_float} shipping <= {reserve_max}")
                 log.debug(
                     f"{reserve_min} <= {price_float} + {ship_float} shipping <= {reserve_max}"
                 )
                 log.info("Adding to cart")
+                atc_attempted = True
                 # Get the offering ID
                 offering_id_elements = atc_button.find_elements_by_xpath(
                     "./preceding::input[@name='offeringID.1'][1]"
@@ -827,35 +1968,28 @@ class Amazon:
                     if self.attempt_atc(
                         offering_id, max_atc_retries=DEFAULT_MAX_ATC_TRIES
                     ):
-                        return True
+                        self.publish_event(AddedToCart(asin))
+                        return self.stock_check_result(StockCheckOutcome.IN_STOCK)
                     else:
-                        self.send_notification(
-                            "Failed Add to Cart after {max-atc-retries}",
-                            "failed-atc",
-                            self.take_screenshots,
+                        self.publish_event(
+                            AddToCartFailed(
+                                asin, "Failed Add to Cart after {max-atc-retries}"
+                            )
                         )
                         self.save_page_source("failed-atc")
-                        return False
+                        return self.stock_check_result(StockCheckOutcome.ATC_FAILED)
                 else:
                     log.error(
                         "Unable to find offering ID to add to cart.  Using legacy mode."
                     )
-                    self.notification_handler.play_notify_sound()
-                    if self.detailed:
-                        self.send_notification(
-                            message=f"Found Stock ASIN:{asin}",
-                            page_name="Stock Alert",
-                            take_screenshot=self.take_screenshots,
-                        )
-
-                    presence.buy_update()
+                    self.publish_event(StockFound(asin))
                     current_title = self.driver.title
                     # log.info(f"current page title is {current_title}")
                     try:
                         atc_button.click()
                     except IndexError:
                         log.debug("Index Error")
-                        return False
+                        return self.stock_check_result(StockCheckOutcome.ERROR)
                     self.wait_for_page_change(current_title)
                     # log.info(f"page title is {self.driver.title}")
                     emtpy_cart_elements = self.driver.find_elements_by_xpath(
@@ -866,7 +2000,8 @@ class Amazon:
                         not emtpy_cart_elements
                         and self.driver.title in amazon_config["SHOPPING_CART_TITLES"]
                     ):
-                        return True
+                        self.publish_event(AddedToCart(asin))
+                        return self.stock_check_result(StockCheckOutcome.IN_STOCK)
                     else:
                         log.info("did not add to cart, trying again")
                         if emtpy_cart_elements:
@@ -874,9 +2009,7 @@ class Amazon:
                                 "Cart appeared empty after clicking Add To Cart button"
                             )
                         log.debug(f"failed title was {self.driver.title}")
-                        self.send_notification(
-                            "Failed Add to Cart", "failed-atc", self.take_screenshots
-                        )
+                        self.publish_event(AddToCartFailed(asin))
                         self.save_page_source("failed-atc")
                         in_stock = self.check_stock(
                             asin=asin,
@@ -884,7 +2017,90 @@ class Amazon:
                             reserve_min=reserve_min,
                             retry=retry + 1,
                         )
-        return in_stock
+        if in_stock or atc_attempted:
+            # A retried add to cart has already recorded how it went
+            return in_stock
+        if offer_hash:
+            # Nothing qualified, so the same offers next time won't qualify either
+            self.unchanged_offers[asin] = (offer_hash, reserve_min, reserve_max)
+        return self.stock_check_result(StockCheckOutcome.OVER_RESERVE)
+
+    def stock_check_result(self, outcome):
+        """Remembers how the last stock check ended and returns whether it found stock"""
+        self.check_outcome = outcome
+        if self.checking:
+            metrics.record_event(
+                "stock_check.outcome", asin=self.checking[0], outcome=outcome.value
+            )
+        if self.check_journal and self.checking:
+            asin, reserve_min, reserve_max = self.checking
+            self.check_journal.record(
+                asin,
+                outcome.value,
+                latency=time.time() - self.check_started,
+                reserve_min=reserve_min,
+                reserve_max=reserve_max,
+                **self.check_details,
+            )
+        if self.recorder and self.checking:
+            asin, reserve_min, reserve_max = self.checking
+            self.recorder.record(
+                "decision",
+                kind="stock_check",
+                asin=asin,
+                reserve_min=reserve_min,
+                reserve_max=reserve_max,
+                outcome=outcome.value,
+                latency=round(time.time() - self.check_started, 4),
+            )
+        return outcome == StockCheckOutcome.IN_STOCK
+
+    def note_offer(self, price, shipping, condition):
+        """Keeps the cheapest offer the check evaluated"""
+        best = self.check_details.get("price")
+        total = float(price) + float(shipping)
+        if best is None or total < best + self.check_details["shipping"]:
+            self.check_details.update(
+                price=float(price), shipping=float(shipping), condition=condition
+            )
+
+    def check_failed(self):
+        """True if the last stock check couldn't do its job, rather than just finding no stock"""
+        return self.captcha_seen or (
+            self.check_outcome is not None and self.check_outcome.is_failure
+        )
+
+    def record_offer_snapshot(self, asin):
+        try:
+            fragments = self.driver.execute_script(
+                OFFER_SNAPSHOT_JS, OFFER_SNAPSHOT_XPATHS
+            )
+        except sel_exceptions.WebDriverException as e:
+            log.debug(f"Could not snapshot the offer page: {e}")
+            return
+        self.recorder.record(
+            "snapshot",
+            asin=asin,
+            url=self.driver.current_url,
+            title=self.driver.title,
+            fragments=fragments or [],
+        )
+
+    def get_offer_hash(self):
+        try:
+            return self.driver.execute_script(OFFER_HASH_JS)
+        except sel_exceptions.WebDriverException as e:
+            log.debug(f"Could not hash offers: {e}")
+            return None
+
+    def record_offer_hash_result(self, short_circuit):
+        metrics.increment("stock_check.hashed")
+        if short_circuit:
+            metrics.increment("stock_check.short_circuit")
+        metrics.set_gauge(
+            "stock_check.short_circuit_rate",
+            round(metrics.ratio("stock_check.short_circuit", "stock_check.hashed"), 3),
+        )
 
     def attempt_atc(self, offering_id, max_atc_retries=DEFAULT_MAX_ATC_TRIES):
         # Open the add.html URL in Selenium
@@ -920,6 +2136,82 @@ class Amazon:
         log.error("reached maximum ATC attempts, returning to stock check")
         return False
 
+    def get_cart_initiate_id(self):
+        """Looks on the current page for the cart ID that the checkout URL needs"""
+        try:
+            element = self.get_amazon_element(key="CART_INITIATE_ID")
+        except sel_exceptions.NoSuchElementException:
+            return None
+        if element.tag_name == "input":
+            return element.get_attribute("value") or None
+        # Links and forms carry it as a query parameter
+        url = element.get_attribute("href") or element.get_attribute("action")
+        if not url:
+            return None
+        return furl(url).args.get("cartInitiateId") or None
+
+    @debug
+    def go_to_direct_checkout(self):
+        """Skips the cart page and Proceed To Checkout click by loading the checkout URL directly.
+        Anything that doesn't look like checkout is left for the regular cart flow to handle
+        """
+        cart_id = self.get_cart_initiate_id()
+        if not cart_id:
+            log.info(
+                "No cart ID found for direct checkout, using the cart page instead"
+            )
+            return False
+        log.info("Going straight to checkout...")
+        self.start_time_atc = time.time()
+        url = CHECKOUT_URL.format(domain=self.amazon_website, cart_id=cart_id)
+        if not self.get_page(url):
+            log.info("Direct checkout page did not load, using the cart page instead")
+            self.get_page(AMAZON_URLS["CART_URL"])
+            return False
+        if self.driver.title in amazon_config["SHOPPING_CART_TITLES"]:
+            log.info("Direct checkout bounced back to the cart, using the cart flow")
+            return False
+        self.checkout_path = "direct"
+        return True
+
+    def record_checkout_reached(self):
+        """Records the add to cart -> checkout page stage timing once per checkout attempt"""
+        if not self.atc_confirmed_time:
+            return
+        elapsed = time.time() - self.atc_confirmed_time
+        self.atc_confirmed_time = 0
+        metrics.record_timing(f"checkout.atc_to_checkout.{self.checkout_path}", elapsed)
+        if self.checkout_path == "cart":
+            self.update_cart_flow_baseline(elapsed)
+        elif self.checkout_path == "direct":
+            if not self.cart_flow_baseline:
+                log.info(f"Reached checkout directly in {elapsed:.3f} seconds")
+            else:
+                saved = self.cart_flow_baseline["mean"] - elapsed
+                metrics.record_timing("checkout.direct_saved", saved)
+                log.info(
+                    f"Reached checkout directly in {elapsed:.3f} seconds, "
+                    f"{saved:.3f} seconds faster than the cart flow"
+                )
+
+    def update_cart_flow_baseline(self, elapsed):
+        """Folds a cart flow time into the baseline that direct checkouts are compared against.
+        It is kept across runs, since a run with --direct-checkout rarely takes the cart flow
+        """
+        baseline = self.cart_flow_baseline or {"mean": 0.0, "count": 0}
+        # Capping the count makes older runs fade out once there are enough samples
+        count = min(baseline["count"] + 1, DEFAULT_BASELINE_SAMPLES)
+        mean = baseline["mean"] + (elapsed - baseline["mean"]) / count
+        self.cart_flow_baseline = {"mean": mean, "count": count}
+        if self.browserless:
+            return
+        try:
+            save_checkout_baseline(
+                CHECKOUT_BASELINE_PATH, self.amazon_website, self.cart_flow_baseline
+            )
+        except OSError as e:
+            log.debug(f"Could not save the cart flow baseline: {e}")
+
     # search lists of asin lists, and remove the first list that matches provided asin
     @debug
     def remove_asin_list(self, asin):
@@ -928,50 +2220,50 @@ class Amazon:
                 self.asin_list.pop(i)
                 self.reserve_max.pop(i)
                 self.reserve_min.pop(i)
+                self.priorities.pop(i)
+                self.check_intervals.pop(i)
                 break
 
     # checkout page navigator
     @debug
     def navigate_pages(self, test):
-        title = self.driver.title
+        title = self.get_checkout_title()
         log.debug(f"Navigating page title: '{title}'")
-        # see if this resolves blank page title issue?
-        if title == "":
-            timeout_seconds = DEFAULT_MAX_TIMEOUT
-            log.debug(
-                f"Title was blank, checking to find a real title for {timeout_seconds} seconds"
+        state = self.get_checkout_state(title)
+        if self.checkout_machine:
+            self.checkout_machine.transition(state)
+        if self.recorder:
+            self.recorder.record(
+                "checkout_page",
+                url=self.driver.current_url,
+                title=title,
+                state=state.name,
             )
-            timeout = self.get_timeout(timeout=timeout_seconds)
-            while True:
-                if self.driver.title != "":
-                    title = self.driver.title
-                    log.debug(f"found a real title: {title}.")
-                    break
-                if time.time() > timeout:
-                    log.debug("Time out reached, page title was still blank.")
-                    break
-        if title in amazon_config["SIGN_IN_TITLES"]:
+        if state == CheckoutState.SIGN_IN:
             self.login()
-        elif title in amazon_config["CAPTCHA_PAGE_TITLES"]:
+        elif state == CheckoutState.CAPTCHA:
             self.handle_captcha()
-        elif title in amazon_config["SHOPPING_CART_TITLES"]:
+        elif state == CheckoutState.CART:
+            self.collect_page_telemetry("cart")
             self.handle_cart()
-        elif title in amazon_config["CHECKOUT_TITLES"]:
+        elif state == CheckoutState.CHECKOUT:
+            self.collect_page_telemetry("checkout")
             self.handle_checkout(test)
-        elif title in amazon_config["ORDER_COMPLETE_TITLES"]:
+        elif state == CheckoutState.ORDER_COMPLETE:
+            self.collect_page_telemetry("order_complete")
             self.handle_order_complete()
-        elif title in amazon_config["PRIME_TITLES"]:
+        elif state == CheckoutState.PRIME:
             self.handle_prime_signup()
-        elif title in amazon_config["HOME_PAGE_TITLES"]:
+        elif state == CheckoutState.HOME:
             # if home page, something went wrong
             self.handle_home_page()
-        elif title in amazon_config["DOGGO_TITLES"]:
+        elif state == CheckoutState.DOGS:
             self.handle_doggos()
-        elif title in amazon_config["OUT_OF_STOCK"]:
+        elif state == CheckoutState.OUT_OF_STOCK:
             self.handle_out_of_stock()
-        elif title in amazon_config["BUSINESS_PO_TITLES"]:
+        elif state == CheckoutState.BUSINESS_PO:
             self.handle_business_po()
-        elif title in amazon_config["ADDRESS_SELECT"]:
+        elif state == CheckoutState.ADDRESS_SELECT:
             if self.shipping_bypass:
                 self.handle_shipping_page()
             else:
@@ -982,145 +2274,163 @@ class Amazon:
                 )
                 self.handle_unknown_title(title)
         else:
-            log.debug(f"title is: [{title}]")
-            # see if we can handle blank titles here
-            time.sleep(
-                3
-            )  # wait a few seconds for page to load, since we don't know what we are dealing with
-            log.warning(
-                "FairGame is not sure what page it is on - will attempt to resolve."
+            self.handle_unknown_page(title)
+
+    def get_checkout_title(self):
+        title = self.driver.title
+        # see if this resolves blank page title issue?
+        if title == "":
+            log.debug(
+                f"Title was blank, checking to find a real title for {DEFAULT_MAX_TIMEOUT} seconds"
+            )
+            if self.wait_for_condition(lambda d: d.title != "", DEFAULT_MAX_TIMEOUT):
+                title = self.driver.title
+                log.debug(f"found a real title: {title}.")
+            else:
+                log.debug("Time out reached, page title was still blank.")
+        return title
+
+    @staticmethod
+    def get_checkout_state(title):
+        for config_key, state in CHECKOUT_TITLE_STATES:
+            if title in amazon_config[config_key]:
+                return state
+        return CheckoutState.UNKNOWN
+
+    def handle_unknown_page(self, title):
+        log.debug(f"title is: [{title}]")
+        # wait for the page to finish loading, since we don't know what we are dealing with
+        self.wait_for_page_load(timeout=3)
+        log.warning(
+            "FairGame is not sure what page it is on - will attempt to resolve."
+        )
+        ###################################################################
+        # PERFORM ELEMENT CHECKS TO SEE IF WE CAN FIGURE OUT WHERE WE ARE #
+        ###################################################################
+
+        element = None
+        # check page for order complete?
+        try:
+            element = self.driver.find_element_by_xpath(
+                '//*[@class="a-box a-alert a-alert-success"]'
+            )
+        except sel_exceptions.NoSuchElementException:
+            pass
+        if element:
+            log.info("FairGame thinks it completed the purchase, please verify ASAP")
+            self.send_notification(
+                message="FairGame may have made a purchase, please confirm ASAP",
+                page_name="unknown-title-purchase",
+                take_screenshot=self.take_screenshots,
+            )
+            self.send_notification(
+                message="Notifications that follow assume purchase has been made, YOU MUST CONFIRM THIS ASAP",
+                page_name="confirm-purchase",
+                take_screenshot=False,
             )
-            ###################################################################
-            # PERFORM ELEMENT CHECKS TO SEE IF WE CAN FIGURE OUT WHERE WE ARE #
-            ###################################################################
+            self.handle_order_complete()
+            return
 
-            element = None
-            # check page for order complete?
-            try:
-                element = self.driver.find_element_by_xpath(
-                    '//*[@class="a-box a-alert a-alert-success"]'
-                )
-            except sel_exceptions.NoSuchElementException:
-                pass
-            if element:
-                log.info(
-                    "FairGame thinks it completed the purchase, please verify ASAP"
-                )
-                self.send_notification(
-                    message="FairGame may have made a purchase, please confirm ASAP",
-                    page_name="unknown-title-purchase",
-                    take_screenshot=self.take_screenshots,
-                )
-                self.send_notification(
-                    message="Notifications that follow assume purchase has been made, YOU MUST CONFIRM THIS ASAP",
-                    page_name="confirm-purchase",
-                    take_screenshot=False,
-                )
-                self.handle_order_complete()
+        element = None
+        # Prime offer page?
+        try:
+            element = self.get_amazon_element(key="PRIME_NO_THANKS")
+        except sel_exceptions.NoSuchElementException:
+            pass
+        if element:
+            if self.do_button_click(
+                button=element,
+                clicking_text="FairGame thinks it is seeing a Prime Offer, attempting to click No Thanks",
+                fail_text="FairGame could not click No Thanks button",
+                log_debug=True,
+            ):
                 return
-
-            element = None
-            # Prime offer page?
-            try:
-                element = self.get_amazon_element(key="PRIME_NO_THANKS")
-            except sel_exceptions.NoSuchElementException:
-                pass
-            if element:
-                if self.do_button_click(
-                    button=element,
-                    clicking_text="FairGame thinks it is seeing a Prime Offer, attempting to click No Thanks",
-                    fail_text="FairGame could not click No Thanks button",
-                    log_debug=True,
-                ):
-                    return
-            # see if a use this address (or similar) button is on page (based on known xpaths). Only check if
-            # user has set the shipping_bypass flag
-            if self.shipping_bypass:
-                if self.handle_shipping_page():
-                    return
-
-            if self.get_cart_count() == 0:
-                log.info("It appears you have nothing in your cart.")
-                log.info("Returning to stock check.")
-                self.try_to_checkout = False
+        # see if a use this address (or similar) button is on page (based on known xpaths). Only check if
+        # user has set the shipping_bypass flag
+        if self.shipping_bypass:
+            if self.handle_shipping_page():
                 return
 
-            ##############################
-            # other element checks above #
-            ##############################
+        if self.get_cart_count() == 0:
+            log.info("It appears you have nothing in your cart.")
+            log.info("Returning to stock check.")
+            self.try_to_checkout = False
+            return
 
-            # if above checks don't work, just continue on to trying to resolve
+        ##############################
+        # other element checks above #
+        ##############################
 
-            # try to handle an unknown title
-            log.error(
-                f"'{title}' is not a known page title. Please create issue indicating the title with a screenshot of page"
+        # if above checks don't work, just continue on to trying to resolve
+
+        # try to handle an unknown title
+        log.error(
+            f"'{title}' is not a known page title. Please create issue indicating the title with a screenshot of page"
+        )
+        # give user 30 seconds to respond
+        self.handle_unknown_title(title=title)
+        # check if page title changed, if not, then continue doing other checks:
+        if self.driver.title != title:
+            log.info(
+                "FairGame thinks user intervened in time, will now continue running"
             )
-            # give user 30 seconds to respond
-            self.handle_unknown_title(title=title)
-            # check if page title changed, if not, then continue doing other checks:
-            if self.driver.title != title:
-                log.info(
-                    "FairGame thinks user intervened in time, will now continue running"
-                )
+            return
+        else:
+            log.warning(
+                "FairGame does not think the user intervened in time, will attempt other methods to continue"
+            )
+        log.info("Going to try and redirect to cart page")
+        try:
+            with self.wait_for_page_content_change(timeout=10):
+                self.driver.get(AMAZON_URLS["CART_URL"])
+        except sel_exceptions.WebDriverException:
+            log.error("failed to load cart URL, refreshing and returning to handler")
+            with self.wait_for_page_content_change(timeout=10):
+                self.driver.refresh()
+            return
+        self.wait_for_page_load(timeout=1)
+        # verify cart quantity is not zero
+        # note, not using greater than 0, in case there is an error,
+        # still want to try and proceed, if possible
+        if self.get_cart_count() == 0:
+            log.info("It appears you have nothing in your cart.")
+            log.info("Returning to stock check.")
+            self.try_to_checkout = False
+            return
+
+        log.info("trying to click proceed to checkout")
+        timeout = self.get_timeout()
+        while True:
+            try:
+                button = self.get_amazon_element(key="PTC")
+                break
+            except sel_exceptions.NoSuchElementException:
+                button = None
+            if time.time() > timeout:
+                log.error("Could not find and click button")
+                break
+        if button:
+            if self.do_button_click(
+                button=button,
+                clicking_text="Found ptc button, attempting to click.",
+                clicked_text="Clicked ptc button",
+                fail_text="Could not click button",
+            ):
                 return
             else:
-                log.warning(
-                    "FairGame does not think the user intervened in time, will attempt other methods to continue"
-                )
-            log.info("Going to try and redirect to cart page")
-            try:
-                with self.wait_for_page_content_change(timeout=10):
-                    self.driver.get(AMAZON_URLS["CART_URL"])
-            except sel_exceptions.WebDriverException:
-                log.error(
-                    "failed to load cart URL, refreshing and returning to handler"
-                )
-                with self.wait_for_page_content_change(timeout=10):
+                with self.wait_for_page_content_change():
                     self.driver.refresh()
                 return
-            time.sleep(1)  # wait a second for page to load
-            # verify cart quantity is not zero
-            # note, not using greater than 0, in case there is an error,
-            # still want to try and proceed, if possible
-            if self.get_cart_count() == 0:
-                log.info("It appears you have nothing in your cart.")
-                log.info("Returning to stock check.")
-                self.try_to_checkout = False
-                return
-
-            log.info("trying to click proceed to checkout")
-            timeout = self.get_timeout()
-            while True:
-                try:
-                    button = self.get_amazon_element(key="PTC")
-                    break
-                except sel_exceptions.NoSuchElementException:
-                    button = None
-                if time.time() > timeout:
-                    log.error("Could not find and click button")
-                    break
-            if button:
-                if self.do_button_click(
-                    button=button,
-                    clicking_text="Found ptc button, attempting to click.",
-                    clicked_text="Clicked ptc button",
-                    fail_text="Could not click button",
-                ):
-                    return
-                else:
-                    with self.wait_for_page_content_change():
-                        self.driver.refresh()
-                    return
 
-            # if we made it this far, all attempts to handle page failed, get current page info and return to handler
-            log.error(
-                "FairGame could not navigate current page, refreshing and returning to handler"
-            )
-            self.save_page_source(page="unknown")
-            self.save_screenshot(page="unknown")
-            with self.wait_for_page_content_change():
-                self.driver.refresh()
-            return
+        # if we made it this far, all attempts to handle page failed, get current page info and return to handler
+        log.error(
+            "FairGame could not navigate current page, refreshing and returning to handler"
+        )
+        self.save_page_source(page="unknown")
+        self.save_screenshot(page="unknown")
+        with self.wait_for_page_content_change():
+            self.driver.refresh()
+        return
 
     def handle_unknown_title(self, title):
         if not self.unknown_title_notification_sent:
@@ -1131,10 +2441,10 @@ class Amazon:
                 self.take_screenshots,
             )
             self.unknown_title_notification_sent = True
-        for i in range(30, 0, -1):
-            log.warning(f"{i}...")
-            time.sleep(1)
-        return
+        timeout = self.state_timeout(30)
+        log.warning(f"Waiting up to {timeout:.0f} seconds for the page to change...")
+        # Carry on as soon as the user moves the page along
+        self.wait_for_condition(lambda d: d.title != title, timeout)
 
     # Method to try and click the handle shipping page
     def handle_shipping_page(self):
@@ -1191,9 +2501,10 @@ class Amazon:
     @debug
     def handle_prime_signup(self):
         log.info("Prime offer page popped up, attempting to click No Thanks")
-        time.sleep(
-            2
-        )  # just doing manual wait, sign up for prime if you don't want to deal with this
+        # sign up for prime if you don't want to deal with this
+        self.wait_for_condition(
+            lambda d: self.get_amazon_elements(key="PRIME_NO_THANKS"), timeout=2
+        )
         button = None
         try:
             button = self.get_amazon_element(key="PRIME_NO_THANKS")
@@ -1216,18 +2527,18 @@ class Amazon:
 
         # If we get to this point, there was either no button, or we couldn't click it (exception hit above)
         log.error("Prime offer page popped up, user intervention required")
-        self.notification_handler.play_alarm_sound()
-        self.notification_handler.send_notification(
-            "Prime offer page popped up, user intervention required"
+        self.publish_event(
+            CheckoutFailed(
+                "Prime offer page popped up, user intervention required", alarm=True
+            )
         )
-        timeout = self.get_timeout(timeout=60)
-        while self.driver.title in amazon_config["PRIME_TITLES"]:
-            if time.time() > timeout:
-                log.info("user did not intervene in time, will try and refresh page")
-                with self.wait_for_page_content_change():
-                    self.driver.refresh()
-                break
-            time.sleep(0.5)
+        if not self.wait_for_condition(
+            lambda d: d.title not in amazon_config["PRIME_TITLES"],
+            self.state_timeout(60),
+        ):
+            log.info("user did not intervene in time, will try and refresh page")
+            with self.wait_for_page_content_change():
+                self.driver.refresh()
 
     def do_button_click(
         self,
@@ -1333,7 +2644,7 @@ class Amazon:
                 log.info("Refreshing page to try again")
                 with self.wait_for_page_content_change():
                     self.driver.refresh()
-                self.checkout_retry += 1
+                self.retry_checkout_state()
                 return
 
         if button:
@@ -1351,10 +2662,11 @@ class Amazon:
                 log.info("Refreshing page to try again")
                 with self.wait_for_page_content_change():
                     self.driver.refresh()
-                self.checkout_retry += 1
+                self.retry_checkout_state()
 
     @debug
     def handle_checkout(self, test):
+        self.record_checkout_reached()
         previous_title = self.driver.title
         button = None
         timeout = self.get_timeout()
@@ -1380,9 +2692,9 @@ class Amazon:
                     self.take_screenshots,
                 )
                 log.info("Refreshing page to try again")
-                self.driver.refresh()
-                time.sleep(DEFAULT_PAGE_WAIT_DELAY)
-                self.order_retry += 1
+                with self.wait_for_page_content_change():
+                    self.driver.refresh()
+                self.retry_checkout_state()
                 return
         if test:
             log.info(f"Found button {button.text}, but this is a test")
@@ -1399,8 +2711,7 @@ class Amazon:
     @debug
     def handle_order_complete(self):
         log.info("Order Placed.")
-        self.send_notification("Order placed.", "order-placed", self.take_screenshots)
-        self.notification_handler.play_purchase_sound()
+        self.publish_event(OrderPlaced(elapsed=time.time() - self.start_time_atc))
         self.great_success = True
         if self.single_shot:
             self.asin_list = []
@@ -1409,15 +2720,15 @@ class Amazon:
 
     @debug
     def handle_doggos(self):
-        self.notification_handler.send_notification(
-            "You got dogs, bot may not work correctly. Ending Checkout"
+        self.publish_event(
+            CheckoutFailed("You got dogs, bot may not work correctly. Ending Checkout")
         )
         self.try_to_checkout = False
 
     @debug
     def handle_out_of_stock(self):
-        self.notification_handler.send_notification(
-            "Carted it, but went out of stock, better luck next time."
+        self.publish_event(
+            CheckoutFailed("Carted it, but went out of stock, better luck next time.")
         )
         self.try_to_checkout = False
 
@@ -1425,7 +2736,12 @@ class Amazon:
     def handle_captcha(self, check_presence=True):
         # wait for captcha to load
         log.debug("Waiting for captcha to load.")
-        time.sleep(DEFAULT_MAX_WEIRD_PAGE_DELAY)
+        self.wait_for_condition(
+            EC.presence_of_element_located(
+                (By.XPATH, '//form[contains(@action,"validateCaptcha")]')
+            ),
+            DEFAULT_MAX_WEIRD_PAGE_DELAY,
+        )
         current_page = self.driver.title
         try:
             if not check_presence or self.driver.find_element_by_xpath(
@@ -1527,7 +2843,10 @@ class Amazon:
             self.notification_handler.send_notification(
                 "Could not click continue button, user intervention required"
             )
-            time.sleep(300)
+            current_page = self.driver.title
+            self.wait_for_condition(
+                lambda d: d.title != current_page, self.state_timeout(300)
+            )
 
     def save_screenshot(self, page):
         file_name = get_timestamp_filename("screenshots/screenshot-" + page, ".png")
@@ -1579,9 +2898,99 @@ class Amazon:
         else:
             return False
 
+    def wait_for_condition(self, condition, timeout):
+        """Waits until condition(driver) is truthy.  Returns its value, or False on timeout"""
+        try:
+            return WebDriverWait(
+                self.driver, timeout, poll_frequency=DEFAULT_CONDITION_POLL
+            ).until(condition)
+        except sel_exceptions.TimeoutException:
+            return False
+
+    def wait_for_offer_page(self, asin):
+        """Waits for a page requested without waiting (a prefetch) to be the offer page for `asin`.
+        Until the new document commits, the tab still shows the previous ASIN's offers
+        """
+        return self.wait_for_condition(
+            lambda d: asin in d.current_url
+            and d.execute_script("return document.readyState") != "loading",
+            DEFAULT_MAX_TIMEOUT,
+        )
+
+    def wait_for_page_load(self, timeout):
+        return self.wait_for_condition(
+            lambda d: d.execute_script("return document.readyState") == "complete",
+            timeout,
+        )
+
+    def state_timeout(self, timeout):
+        """Caps a wait at what is left of the current checkout state's deadline"""
+        remaining = self.checkout_machine.remaining() if self.checkout_machine else None
+        return timeout if remaining is None else min(timeout, remaining)
+
     def page_wait_delay(self):
         return DEFAULT_PAGE_WAIT_DELAY
 
+    def subscribe_side_effects(self):
+        """Notifications, sounds, presence and metrics run on their own workers, so the purchase
+        path only has to publish what happened"""
+        self.events.subscribe(
+            "notifications",
+            [StockFound, AddToCartFailed, OrderPlaced, CheckoutFailed],
+            self.notify_event,
+        )
+        self.events.subscribe(
+            "sounds", [StockFound, OrderPlaced, CheckoutFailed], self.play_event_sound
+        )
+        self.events.subscribe(
+            "presence", [StockFound], lambda event: presence.buy_update()
+        )
+        self.events.subscribe(
+            "metrics",
+            [Event],
+            lambda event: metrics.record_event(f"event.{event.name}"),
+        )
+
+    def publish_event(self, event):
+        """Publishes an event, taking the screenshot its notification needs first.  The driver
+        is only used from this thread, so the page captured is the one the event happened on
+        """
+        if self.take_screenshots and self.wants_screenshot(event):
+            try:
+                event.screenshot = self.driver.get_screenshot_as_png()
+            except sel_exceptions.WebDriverException as e:
+                log.debug(f"Could not take a screenshot for {event.name}: {e}")
+        self.events.publish(event)
+
+    def wants_screenshot(self, event):
+        if isinstance(event, StockFound):
+            return self.detailed
+        return type(event) in EVENT_SCREENSHOT_NAMES
+
+    def notify_event(self, event):
+        """Sends the notification for an event, with the screenshot taken when it was published"""
+        if isinstance(event, StockFound) and not self.detailed:
+            return
+        file_name = None
+        if event.screenshot:
+            file_name = get_timestamp_filename(
+                "screenshots/screenshot-" + EVENT_SCREENSHOT_NAMES[type(event)], ".png"
+            )
+            with open(file_name, "wb") as f:
+                f.write(event.screenshot)
+        if file_name:
+            self.notification_handler.send_notification(event.message, file_name)
+        else:
+            self.notification_handler.send_notification(event.message)
+
+    def play_event_sound(self, event):
+        if isinstance(event, StockFound):
+            self.notification_handler.play_notify_sound()
+        elif isinstance(event, OrderPlaced):
+            self.notification_handler.play_purchase_sound()
+        elif isinstance(event, CheckoutFailed) and event.alarm:
+            self.notification_handler.play_alarm_sound()
+
     def send_notification(self, message, page_name, take_screenshot=True):
         if take_screenshot:
             file_name = self.save_screenshot(page_name)
@@ -1593,11 +3002,14 @@ class Amazon:
         return time.time() + timeout
 
     def get_webdriver_pids(self):
-        pid = self.driver.service.process.pid
-        driver_process = psutil.Process(pid)
-        children = driver_process.children(recursive=True)
-        for child in children:
-            self.webdriver_child_pids.append(child.pid)
+        # Only this session's processes, PIDs of an earlier browser may have been reused since
+        self.webdriver_child_pids = find_webdriver_pids(self.driver)
+
+    def get_webdriver_pid(self):
+        try:
+            return self.driver.service.process.pid
+        except AttributeError:
+            return None
 
     def get_page(self, url):
         check_cart_element = None
@@ -1630,7 +3042,15 @@ class Amazon:
             return False
 
     def __del__(self):
+        self.resource_watchdog.stop()
+        if self.cdp_engine:
+            self.close_cdp_page()
+            self.cdp_engine.stop()
         self.delete_driver()
+        if self.standby_driver:
+            self.delete_driver(
+                driver=self.standby_driver, child_pids=self.standby_child_pids
+            )
 
     def show_config(self):
         log.info(f"{'=' * 50}")
@@ -1683,11 +3103,52 @@ class Amazon:
             log.info(f"--Notification sounds are disabled.")
         if self.ACTIVE_OFFER_URL == AMAZON_URLS["ALT_OFFER_URL"]:
             log.info(f"--Using alternate offers URL")
+        if self.direct_checkout:
+            log.info(
+                f"--Direct checkout enabled, the cart page will be skipped if possible"
+            )
+        if self.prefetch:
+            log.info(f"--Next offer page is prefetched in a second tab")
+        if self.watch:
+            log.info(f"--Watching offers in place, one tab per ASIN")
+        if self.http_probe:
+            log.info(f"--Stock is probed over HTTP, the browser is used for checkout")
+        if self.scheduler:
+            log.info(f"--ASINs are checked by priority and interval")
+        if self.standby_browser:
+            log.info(f"--A standby browser is kept ready for instant recovery")
+        if self.pin_endpoint:
+            log.info(
+                f"--{', '.join(self.get_pinned_hosts())} are pinned to their fastest endpoints"
+            )
+        if self.check_journal:
+            log.info(f"--Stock checks are saved to {CHECK_JOURNAL_PATH}")
+        if self.fast_startup:
+            log.info(f"--Startup skips the home page when the profile is logged in")
+        if self.cdp_engine:
+            log.info(f"--Offer pages are loaded over the DevTools protocol")
+        if self.page_telemetry:
+            log.info(f"--Page telemetry is collected and regressions are reported")
+        if self.lean_switches or self.lean_blocked_urls:
+            log.info(
+                f"--Lean browser profile: {len(self.lean_switches)} switches, "
+                f"{len(self.lean_blocked_urls)} blocked URL patterns"
+            )
+        if self.resource_watchdog.max_rss_mb:
+            log.info(
+                f"--Browser is recycled above {self.resource_watchdog.max_rss_mb} MB of memory"
+            )
+        if self.resource_watchdog.max_cpu_percent:
+            log.info(
+                f"--Browser is recycled when CPU stays above {self.resource_watchdog.max_cpu_percent}%"
+            )
         if self.testing:
             log.warning(f"--Testing Mode.  NO Purchases will be made.")
         log.info(f"{'=' * 50}")
 
-    def create_driver(self, path_to_profile):
+    def get_driver_options(self, path_to_profile):
+        """Chrome options for a browser on the given profile.  Each browser gets its own copy so
+        the active and standby browsers can use different profile directories"""
         if self.setup_driver:
 
             if self.headless:
@@ -1702,26 +3163,66 @@ class Amazon:
             else:
                 prefs["profile.managed_default_content_settings.images"] = 0
             options.add_experimental_option("prefs", prefs)
-            options.add_argument(f"user-data-dir={path_to_profile}")
             if not self.slow_mode:
                 options.set_capability("pageLoadStrategy", "none")
 
             self.setup_driver = False
 
+        driver_options = copy.deepcopy(options)
+        driver_options.add_argument(f"user-data-dir={path_to_profile}")
+        if self.pinned_endpoints:
+            # Chrome still sends the real host names for TLS, only the lookups are replaced
+            rules = ",".join(
+                f"MAP {host} {endpoint.address}"
+                for host, endpoint in self.pinned_endpoints.items()
+            )
+            driver_options.add_argument(f"--host-resolver-rules={rules}")
+        for switch in self.lean_switches:
+            driver_options.add_argument(switch)
+        if self.page_telemetry:
+            # Network events end up in the performance log, read back with get_log
+            driver_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return driver_options
+
+    def block_unneeded_urls(self, driver):
+        """Stops the browser from fetching resources the bot never looks at"""
+        if not self.lean_blocked_urls:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd(
+                "Network.setBlockedURLs", {"urls": self.lean_blocked_urls}
+            )
+        except sel_exceptions.WebDriverException as e:
+            log.warning(f"Could not set blocked URLs: {e}")
+
+    def launch_driver(self, path_to_profile):
         # Delete crashed, so restore pop-up doesn't happen
-        path_to_prefs = os.path.join(
-            path_to_profile,
-            "Default",
-            "Preferences",
+        clear_crashed_exit(path_to_profile)
+        start_time = time.time()
+        driver = webdriver.Chrome(
+            executable_path=binary_path,
+            options=self.get_driver_options(path_to_profile),
         )
+        self.block_unneeded_urls(driver)
+        if self.page_telemetry:
+            try:
+                driver.execute_cdp_cmd("Performance.enable", {})
+            except sel_exceptions.WebDriverException as e:
+                log.warning(f"Could not enable performance metrics: {e}")
+        launch_time = time.time() - start_time
+        metrics.record_timing(
+            "driver.launch", launch_time, lean=bool(self.lean_switches)
+        )
+        log.info(f"Chrome started in {launch_time:.2f} seconds")
+        return driver
+
+    def create_driver(self, path_to_profile):
+        if self.pin_endpoint and not self.pinned_endpoints:
+            self.pin_endpoints()
         try:
-            with fileinput.FileInput(path_to_prefs, inplace=True) as file:
-                for line in file:
-                    print(line.replace("Crashed", "none"), end="")
-        except FileNotFoundError:
-            pass
-        try:
-            self.driver = webdriver.Chrome(executable_path=binary_path, options=options)
+            self.driver = self.launch_driver(path_to_profile)
+            self.active_profile_path = path_to_profile
             self.wait = WebDriverWait(self.driver, 10)
             self.get_webdriver_pids()
         except Exception as e:
@@ -1737,12 +3238,230 @@ class Amazon:
 
         return True
 
-    def delete_driver(self):
+    def start_browser(self):
+        """Launches the browser and, unless the login is checked from cookies, loads the home
+        page.  Runs during startup alongside the credential unlock"""
+        # Walking the profile is slow on a big one, so the size is only checked at startup
+        profile_size = get_profile_size(self.profile_path)
+        metrics.set_gauge("profile.bytes", profile_size)
+        log.info(f"Browser profile is {profile_size / (1024 * 1024):.1f} MB")
+        if not self.create_driver(self.profile_path):
+            return False
+        if not self.fast_startup:
+            try:
+                self.driver.get(AMAZON_URLS["BASE_URL"])
+                self.home_page_preloaded = True
+            except sel_exceptions.WebDriverException as e:
+                log.debug(f"Home page did not load during startup: {e}")
+        return True
+
+    def quit_startup_browser(self, browser_stage):
+        """Lets a browser launched during startup come up, then quits it"""
+        try:
+            browser_stage.wait(timeout=DEFAULT_BROWSER_STARTUP_TIMEOUT)
+        except Exception as e:
+            log.debug(f"Browser startup did not finish: {e}")
+        self.delete_driver()
+
+    def get_pinned_hosts(self):
+        """The hosts to pin: the site and, when it is smile, the main site, which serves sign-in
+        and checkout"""
+        hosts = [self.amazon_website]
+        main_site = f"www.{get_cookie_domain(self.amazon_website)}"
+        if main_site not in hosts:
+            hosts.append(main_site)
+        return hosts
+
+    def pin_endpoints(self, force=False):
+        """Pins each host to its fastest endpoint, keeping the old pin of a host that has no
+        reachable endpoint.  Returns True if a host moved to a different endpoint"""
+        # Built aside and swapped in, the browser may be reading the current pins
+        pinned = dict(self.pinned_endpoints)
+        changed = False
+        for host in self.get_pinned_hosts():
+            best = self.refresh_pinned_endpoint(host, force=force)
+            if not best:
+                continue
+            previous = pinned.get(host)
+            if not previous or previous.address != best.address:
+                changed = True
+            pinned[host] = best
+        self.pinned_endpoints = pinned
+        self.pinned_at = time.time()
+        return changed
+
+    def refresh_pinned_endpoint(self, host, force=False):
+        """Picks the fastest reachable endpoint for a host from the cached ranking, ranking the
+        endpoints again if the cache is stale or `force` is set"""
+        ranking = None
+        if not force:
+            ranking = load_ranking(
+                ENDPOINT_CACHE_PATH, host, DEFAULT_ENDPOINT_CACHE_AGE
+            )
+        if ranking is None:
+            from cli.cli import global_config
+
+            log.info(f"Ranking the endpoints of {host}")
+            endpoints, _ = resolve_domain(
+                host,
+                global_config.get_fairgame_config().get("public_dns_servers", {}),
+            )
+            ranking = rank_endpoints(endpoints, server_name=host)
+            try:
+                save_ranking(ENDPOINT_CACHE_PATH, host, ranking)
+            except OSError as e:
+                log.debug(f"Could not cache the endpoint ranking: {e}")
+        reachable = [result for result in ranking if result.median is not None]
+        if not reachable:
+            log.warning(f"No reachable endpoint for {host}, not pinning")
+            return None
+        best = reachable[0]
+        log.info(f"Pinning {host} to {best.address} ({best.median * 1000:.1f}ms)")
+        if host == self.amazon_website:
+            metrics.set_gauge("endpoint.pinned_rtt", round(best.median, 4))
+        return best
+
+    def check_pinned_endpoint(self):
+        """Every few minutes, measures the pinned endpoints in the background"""
+        if not self.pinned_endpoints:
+            return
+        if time.time() - self.pin_checked < DEFAULT_PIN_CHECK_INTERVAL:
+            return
+        if self.pin_thread and self.pin_thread.is_alive():
+            return
+        self.pin_checked = time.time()
+        self.pin_thread = threading.Thread(
+            target=self.monitor_pinned_endpoint, daemon=True
+        )
+        self.pin_thread.start()
+
+    def monitor_pinned_endpoint(self):
+        try:
+            self.rerank_if_degraded()
+        except Exception as e:
+            log.warning(f"Checking the pinned endpoint failed: {e}")
+            log.debug("Pinned endpoint check traceback", exc_info=True)
+
+    def rerank_if_degraded(self):
+        """Ranks the endpoints again when a pinned one got much slower than when it was picked,
+        or once the ranking is older than DEFAULT_ENDPOINT_CACHE_AGE, and schedules a browser
+        recycle if a different endpoint is now faster"""
+        if time.time() - self.pinned_at > DEFAULT_ENDPOINT_CACHE_AGE:
+            log.info("The endpoint ranking is out of date, ranking again")
+        else:
+            # Every host is measured, not just up to the first slow one, to keep the gauge fresh
+            degraded = [
+                host
+                for host, pinned in self.pinned_endpoints.items()
+                if self.is_pin_degraded(host, pinned)
+            ]
+            if not degraded:
+                return
+            log.info(
+                f"Pinned endpoint of {', '.join(degraded)} has slowed down, ranking again"
+            )
+        if self.pin_endpoints(force=True):
+            self.pin_changed = True
+            self.resource_watchdog.request_recycle("re-pinning to a faster endpoint")
+
+    def is_pin_degraded(self, host, pinned):
+        # No ssl_context, so only the TCP connect is timed, same as the ranking's median
+        current = probe_endpoint(pinned.address, samples=3)
+        limit = max(
+            pinned.median * DEFAULT_PIN_DEGRADE_FACTOR,
+            pinned.median + DEFAULT_PIN_DEGRADE_MARGIN,
+        )
+        if current.median is not None and current.median <= limit:
+            if host == self.amazon_website:
+                metrics.set_gauge("endpoint.pinned_rtt", round(current.median, 4))
+            return False
+        metrics.record_event("endpoint.degraded", host=host, address=pinned.address)
+        return True
+
+    def discard_standby_driver(self):
+        with self.standby_lock:
+            standby_driver, standby_pids = self.standby_driver, self.standby_child_pids
+            self.standby_driver = None
+        if standby_driver:
+            self.delete_driver(driver=standby_driver, child_pids=standby_pids)
+
+    def get_standby_profile_path(self):
+        # Alternate between the configured profile and its copy
+        if self.active_profile_path == self.profile_path:
+            return self.profile_path + "-standby"
+        return self.profile_path
+
+    def start_standby_driver(self, retire_driver=None, retire_pids=None):
+        """Launches a standby browser in the background on a fresh copy of the active profile.
+        A driver that was just replaced is shut down first, since its profile gets reused
+        """
+        if not self.standby_browser:
+            return
+        if self.standby_thread and self.standby_thread.is_alive():
+            return
+
+        source_path = self.active_profile_path
+        standby_path = self.get_standby_profile_path()
+
+        def launch():
+            if retire_driver:
+                self.delete_driver(driver=retire_driver, child_pids=retire_pids)
+            start_time = time.time()
+            try:
+                clone_profile(source_path, standby_path)
+                driver = self.launch_driver(standby_path)
+                # Warm it up so connections and caches are ready when it takes over
+                driver.get(AMAZON_URLS["BASE_URL"])
+                child_pids = find_webdriver_pids(driver)
+            except Exception as e:
+                log.warning(f"Could not start the standby browser: {e}")
+                return
+            with self.standby_lock:
+                self.standby_driver = driver
+                self.standby_child_pids = child_pids
+                self.standby_profile_path = standby_path
+            metrics.record_timing("driver.standby_launch", time.time() - start_time)
+            log.debug(f"Standby browser ready on {standby_path}")
+
+        self.standby_thread = threading.Thread(target=launch, daemon=True)
+        self.standby_thread.start()
+
+    def swap_to_standby_driver(self):
+        """Replaces the active driver with the warm standby, if one is ready"""
+        with self.standby_lock:
+            standby_driver = self.standby_driver
+            self.standby_driver = None
+        if not standby_driver:
+            return False
+        start_time = time.time()
+        retire_driver, retire_pids = self.driver, self.webdriver_child_pids
+        self.driver = standby_driver
+        self.webdriver_child_pids = self.standby_child_pids
+        self.active_profile_path = self.standby_profile_path
+        self.wait = WebDriverWait(self.driver, 10)
+        # Reset per-driver state that pointed at the old browser
+        self.check_tab = self.prefetch_tab = None
+        self.watch_tabs = {}
+        self.probe_session = None
+        metrics.record_timing("driver.recovery", time.time() - start_time)
+        metrics.record_event("driver.standby_swap")
+        self.start_standby_driver(retire_driver=retire_driver, retire_pids=retire_pids)
+        return True
+
+    def delete_driver(self, driver=None, child_pids=None):
+        if driver is None:
+            driver = self.driver
+            child_pids = self.webdriver_child_pids
         try:
-            if platform.system() == "Windows" and self.driver:
+            if platform.system() == "Windows" and driver:
                 log.info("Cleaning up after web driver...")
+                try:
+                    # Renderers come and go, so look the tree up again right before killing it
+                    child_pids = find_webdriver_pids(driver)
+                except (psutil.Error, AttributeError):
+                    pass
                 # brute force kill child Chrome pids with fire
-                for pid in self.webdriver_child_pids:
+                for pid in child_pids or []:
                     try:
                         log.debug(f"Killing {pid}...")
                         process = psutil.Process(pid)
@@ -1750,8 +3469,8 @@ class Amazon:
                     except psutil.NoSuchProcess:
                         log.debug(f"{pid} not found. Continuing...")
                         pass
-            elif self.driver:
-                self.driver.quit()
+            elif driver:
+                driver.quit()
 
         except Exception as e:
             log.info(e)
@@ -1762,6 +3481,254 @@ class Amazon:
         return True
 
 
+def get_file_version(path):
+    """Changes whenever the file is written, without reading it"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_autobuy_config(path):
+    """Reads and validates amazon_config.json.  Raises ValueError describing the first problem"""
+    with open(path) as json_file:
+        try:
+            config = json.load(json_file)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path} is not valid JSON: {e}")
+    loaded = {
+        "amazon_website": config.get("amazon_website", "smile.amazon.com"),
+        "asin_list": [],
+        "reserve_min": [],
+        "reserve_max": [],
+        "priorities": [],
+        "check_intervals": [],
+    }
+    try:
+        asin_groups = int(config["asin_groups"])
+        if asin_groups < 1:
+            raise ValueError("asin_groups must be at least 1")
+        for x in range(asin_groups):
+            asins = config[f"asin_list_{x + 1}"]
+            if not isinstance(asins, list) or not asins:
+                raise ValueError(f"asin_list_{x + 1} must be a list of ASINs")
+            reserve_min = float(config[f"reserve_min_{x + 1}"])
+            reserve_max = float(config[f"reserve_max_{x + 1}"])
+            if reserve_min > reserve_max:
+                raise ValueError(
+                    f"reserve_min_{x + 1} is more than reserve_max_{x + 1}"
+                )
+            interval = config.get(f"interval_{x + 1}")
+            loaded["asin_list"].append([str(asin) for asin in asins])
+            loaded["reserve_min"].append(reserve_min)
+            loaded["reserve_max"].append(reserve_max)
+            loaded["priorities"].append(int(config.get(f"priority_{x + 1}", 0)))
+            loaded["check_intervals"].append(
+                float(interval) if interval is not None else None
+            )
+    except KeyError as e:
+        raise ValueError(f"{e} is missing")
+    except TypeError as e:
+        raise ValueError(e)
+    return loaded
+
+
+def load_checkout_baseline(path, website):
+    """The saved cart flow baseline for a site, None if there is none"""
+    try:
+        with open(path) as f:
+            return json.load(f).get(website)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkout_baseline(path, website, baseline):
+    try:
+        with open(path) as f:
+            baselines = json.load(f)
+    except (OSError, ValueError):
+        baselines = {}
+    baselines[website] = baseline
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(baselines, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def get_cookie_domain(website):
+    """The domain login cookies are set on, smile and www share the main site's cookies"""
+    for prefix in ("smile.", "www."):
+        if website.startswith(prefix):
+            return website[len(prefix) :]
+    return website
+
+
+def build_replay_driver(records):
+    """A fake driver serving the offer page snapshots of a recorded session, in order"""
+    pages = {
+        "*OfferListingId.1=*": REPLAY_ATC_PAGE,
+        "replay://cart": REPLAY_CART_PAGE,
+    }
+    snapshot_count = 0
+    for record in records:
+        if record["type"] == "snapshot":
+            record["replay_url"] = f"replay://snapshot/{snapshot_count}"
+            pages[record["replay_url"]] = snapshot_page(
+                record["title"], record["fragments"]
+            )
+            snapshot_count += 1
+    return FakeWebDriver(
+        pages,
+        transitions={("*OfferListingId.1=*", "//input[@name='add']"): "replay://cart"},
+    )
+
+
+def build_benchmark_driver():
+    """A fake driver serving the offer, add to cart, cart, checkout and order complete fixtures
+    in stores/fixtures/amazon.  The forms on each fixture lead to the next page"""
+    return FakeWebDriver(
+        {
+            pattern: load_fixture(os.path.join(BENCHMARK_FIXTURE_PATH, name + ".html"))
+            for pattern, name in BENCHMARK_FIXTURE_PAGES.items()
+        }
+    )
+
+
+def benchmark_session(amazon, rounds):
+    """Runs check_stock and the checkout pages (navigate_pages and the page handlers) over the
+    fixtures of build_benchmark_driver `rounds` times.  Returns the stock check and checkout
+    latencies.  Raises RuntimeError if a round doesn't end in stock and an order placed, which
+    is where the fixtures lead"""
+    # Nothing is bought, so there is nothing to notify about
+    amazon.events = EventBus()
+    asin = BENCHMARK_AUTOBUY_CONFIG["asin_list"][0][0]
+    reserve_min = BENCHMARK_AUTOBUY_CONFIG["reserve_min"][0]
+    reserve_max = BENCHMARK_AUTOBUY_CONFIG["reserve_max"][0]
+    check_latency = []
+    checkout_latency = []
+    for _ in range(rounds):
+        start_time = time.time()
+        amazon.check_stock(asin, reserve_min, reserve_max)
+        check_latency.append(time.time() - start_time)
+        if amazon.check_outcome != StockCheckOutcome.IN_STOCK:
+            raise RuntimeError(
+                f"Stock check ended in {amazon.check_outcome}, expected in stock"
+            )
+        amazon.atc_confirmed_time = time.time()
+        amazon.checkout_path = "cart"
+        start_time = time.time()
+        amazon.run_checkout(asin, test=False)
+        checkout_latency.append(time.time() - start_time)
+        if not amazon.great_success:
+            raise RuntimeError(
+                f"Checkout gave up on '{amazon.driver.title}', expected an order"
+            )
+    return check_latency, checkout_latency
+
+
+def replay_session(amazon, records):
+    """Runs the recorded stock check decisions back through check_stock, on a driver from
+    build_replay_driver.  Checkout pages are recorded without their content, so only the
+    classification of their titles is checked, not the checkout decisions.  Returns a list of
+    (kind, key, recorded, replayed, recorded latency including the page load, evaluation-only
+    replay latency) tuples, the kind being stock_check or checkout_title"""
+    # Side effects belong to the original run
+    amazon.events = EventBus()
+    amazon.recorder = None
+    snapshot = None
+    results = []
+    for record in records:
+        if record["type"] == "snapshot":
+            snapshot = record
+        elif record["type"] == "decision" and record.get("kind") == "stock_check":
+            if not snapshot or snapshot["asin"] != record["asin"]:
+                # Nothing was seen for this check (load failure, captcha, ...)
+                results.append(
+                    ("stock_check", record["asin"], record["outcome"], None, None, None)
+                )
+                continue
+            amazon.driver.get(snapshot["replay_url"])
+            start_time = time.time()
+            amazon.check_stock(
+                record["asin"],
+                record["reserve_min"],
+                record["reserve_max"],
+                prefetched=True,
+            )
+            results.append(
+                (
+                    "stock_check",
+                    record["asin"],
+                    record["outcome"],
+                    amazon.check_outcome.value if amazon.check_outcome else None,
+                    record["latency"],
+                    time.time() - start_time,
+                )
+            )
+            snapshot = None
+        elif record["type"] == "checkout_page":
+            state = amazon.get_checkout_state(record["title"])
+            results.append(
+                (
+                    "checkout_title",
+                    record["title"],
+                    record["state"],
+                    state.name,
+                    None,
+                    None,
+                )
+            )
+    return results
+
+
+def load_recorded_session(path):
+    return list(read_session(path))
+
+
+def find_webdriver_pids(driver):
+    """PIDs of the browser processes started by a driver"""
+    driver_process = psutil.Process(driver.service.process.pid)
+    return [child.pid for child in driver_process.children(recursive=True)]
+
+
+def in_reserve_range(total, reserve_min, reserve_max):
+    return (
+        total <= reserve_max or math.isclose(total, reserve_max, abs_tol=0.01)
+    ) and (total >= reserve_min or math.isclose(total, reserve_min, abs_tol=0.01))
+
+
+def parse_aod_offers(tree):
+    """Extracts price, shipping, condition and offering ID of each purchasable offer in an
+    offers fragment, the same way check_stock reads them from the flyout"""
+    offers = []
+    offer_nodes = tree.xpath(
+        "//div[(@id='aod-pinned-offer' or @id='aod-offer') and .//input[@name='submit.addToCart']]"
+    )
+    for offer_node in offer_nodes:
+        # Parse each offer on its own so the shipping helpers only see this offer
+        offer_tree = html.fromstring(html.tostring(offer_node))
+        prices = offer_tree.xpath(
+            ".//div[contains(@id, 'aod-price')]//span[@class='a-price']//span[@class='a-offscreen']"
+        )
+        forms = offer_tree.xpath(
+            ".//input[@name='submit.addToCart']/ancestor::form[@method='post'][1]"
+        )
+        offering_ids = offer_tree.xpath(".//input[@name='offeringID.1']/@value")
+        offers.append(
+            {
+                "price": parse_price(prices[0].text_content() if prices else None),
+                "shipping": get_shipping_costs(
+                    offer_tree, amazon_config["FREE_SHIPPING"]
+                ),
+                "condition": (
+                    get_item_condition(forms[0].get("action", ""))
+                    if forms
+                    else AmazonItemCondition.Unknown
+                ),
+                "offering_id": offering_ids[0] if offering_ids else None,
+            }
+        )
+    return offers
+
+
 def get_timestamp_filename(name, extension):
     """Utility method to create a filename with a timestamp appended to the root and before
     the provided file extension"""
@@ -1908,6 +3875,86 @@ def get_alt_shipping_costs(tree, free_shipping_string) -> Price:
     return FREE_SHIPPING_PRICE
 
 
+class StockCheckOutcome(Enum):
+    IN_STOCK = "in_stock"
+    NO_OFFERS = "no_offers"
+    OVER_RESERVE = "over_reserve"
+    UNCHANGED = "unchanged"
+    ATC_FAILED = "atc_failed"
+    TIMEOUT = "timeout"
+    ERROR = "error"
+    DOGS = "dogs"
+    LOAD_FAILURE = "load_failure"
+
+    @property
+    def is_failure(self):
+        return self in (
+            StockCheckOutcome.TIMEOUT,
+            StockCheckOutcome.ERROR,
+            StockCheckOutcome.DOGS,
+            StockCheckOutcome.LOAD_FAILURE,
+        )
+
+
+# Screenshot file names for the events whose notifications show the page
+EVENT_SCREENSHOT_NAMES = {
+    StockFound: "Stock Alert",
+    AddToCartFailed: "failed-atc",
+    OrderPlaced: "order-placed",
+}
+
+
+class CheckoutState(Enum):
+    ADD_TO_CART = "add_to_cart"
+    SIGN_IN = "sign_in"
+    CAPTCHA = "captcha"
+    CART = "cart"
+    CHECKOUT = "checkout"
+    ORDER_COMPLETE = "order_complete"
+    PRIME = "prime"
+    HOME = "home"
+    DOGS = "dogs"
+    OUT_OF_STOCK = "out_of_stock"
+    BUSINESS_PO = "business_po"
+    ADDRESS_SELECT = "address_select"
+    UNKNOWN = "unknown"
+    DONE = "done"
+    FAILED = "failed"
+
+
+# Checked in order, the first config title list containing the page title wins
+CHECKOUT_TITLE_STATES = [
+    ("SIGN_IN_TITLES", CheckoutState.SIGN_IN),
+    ("CAPTCHA_PAGE_TITLES", CheckoutState.CAPTCHA),
+    ("SHOPPING_CART_TITLES", CheckoutState.CART),
+    ("CHECKOUT_TITLES", CheckoutState.CHECKOUT),
+    ("ORDER_COMPLETE_TITLES", CheckoutState.ORDER_COMPLETE),
+    ("PRIME_TITLES", CheckoutState.PRIME),
+    ("HOME_PAGE_TITLES", CheckoutState.HOME),
+    ("DOGGO_TITLES", CheckoutState.DOGS),
+    ("OUT_OF_STOCK", CheckoutState.OUT_OF_STOCK),
+    ("BUSINESS_PO_TITLES", CheckoutState.BUSINESS_PO),
+    ("ADDRESS_SELECT", CheckoutState.ADDRESS_SELECT),
+]
+# Total seconds checkout may spend in a state, across all visits
+CHECKOUT_STATE_DEADLINES = {
+    CheckoutState.SIGN_IN: 120,
+    CheckoutState.CAPTCHA: 120,
+    CheckoutState.CART: 60,
+    CheckoutState.CHECKOUT: 60,
+    CheckoutState.PRIME: 90,
+    CheckoutState.HOME: 330,
+    CheckoutState.BUSINESS_PO: 330,
+    CheckoutState.ADDRESS_SELECT: 60,
+    CheckoutState.UNKNOWN: 120,
+}
+# Failed proceed to checkout / place order attempts allowed before checkout gives up
+CHECKOUT_STATE_RETRY_LIMITS = {
+    CheckoutState.CART: DEFAULT_MAX_PTC_TRIES,
+    CheckoutState.CHECKOUT: DEFAULT_MAX_PYO_TRIES,
+}
+
+
 class AmazonItemCondition(Enum):
     # See https://sellercentral.amazon.com/gp/help/external/200386310?language=en_US&ref=efph_200386310_cont_G1831
     New = 10
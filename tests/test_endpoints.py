@@ -0,0 +1,141 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import socket
+import threading
+import time
+
+import dns.message
+import dns.rrset
+
+from utils.endpoints import rank_endpoints, resolve_domain
+
+DOMAIN = "www.example.test"
+STUB_ADDRESS = "192.0.2.10"
+
+
+def start_dns_stub(answer=True, address="127.0.0.1", port=0):
+    """A DNS server on a localhost UDP port, a free one by default.  It answers every A query
+    with STUB_ADDRESS, or with `answer` off reads queries and never replies, like a dead server
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((address, port))
+
+    def serve():
+        while True:
+            try:
+                data, client = sock.recvfrom(512)
+            except OSError:
+                return
+            if not answer:
+                continue
+            query = dns.message.from_wire(data)
+            response = dns.message.make_response(query)
+            response.answer.append(
+                dns.rrset.from_text(query.question[0].name, 60, "IN", "A", STUB_ADDRESS)
+            )
+            sock.sendto(response.to_wire(), client)
+
+    threading.Thread(target=serve, daemon=True).start()
+    return sock
+
+
+def start_listener():
+    """A TCP listener on a free localhost port that accepts and drops connections"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+
+    def serve():
+        while True:
+            try:
+                connection, _ = sock.accept()
+            except OSError:
+                return
+            connection.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return sock
+
+
+def test_resolve_domain_uses_stub_answer():
+    stub = start_dns_stub()
+    try:
+        endpoints, resolutions = resolve_domain(
+            DOMAIN, {"stub": ["127.0.0.1"]}, deadline=2, port=stub.getsockname()[1]
+        )
+    finally:
+        stub.close()
+    assert endpoints == {STUB_ADDRESS}
+    assert resolutions == 1
+
+
+def test_resolve_domain_stops_waiting_at_deadline():
+    dead = start_dns_stub(answer=False)
+    try:
+        start = time.monotonic()
+        endpoints, resolutions = resolve_domain(
+            DOMAIN, {"dead": ["127.0.0.1"]}, deadline=0.5, port=dead.getsockname()[1]
+        )
+        elapsed = time.monotonic() - start
+    finally:
+        dead.close()
+    assert endpoints == set()
+    assert resolutions == 0
+    assert elapsed < 1.5
+
+
+def test_resolve_domain_keeps_answers_when_a_server_is_dead():
+    stub = start_dns_stub()
+    port = stub.getsockname()[1]
+    # Every server is asked on the same port, so the dead one gets another loopback address
+    dead = start_dns_stub(answer=False, address="127.0.0.2", port=port)
+    try:
+        start = time.monotonic()
+        endpoints, resolutions = resolve_domain(
+            DOMAIN,
+            {"stub": ["127.0.0.1"], "dead": ["127.0.0.2"]},
+            deadline=0.5,
+            port=port,
+        )
+        elapsed = time.monotonic() - start
+    finally:
+        stub.close()
+        dead.close()
+    assert endpoints == {STUB_ADDRESS}
+    assert resolutions == 1
+    assert elapsed < 1.5
+
+
+def test_rank_endpoints_puts_unreachable_last():
+    listener = start_listener()
+    port = listener.getsockname()[1]
+    # Nothing listens on 127.0.0.2, so its connects are refused
+    try:
+        ranking = rank_endpoints(
+            ["127.0.0.2", "127.0.0.1"], port=port, samples=3, timeout=1, tls=False
+        )
+    finally:
+        listener.close()
+    assert [result.address for result in ranking] == ["127.0.0.1", "127.0.0.2"]
+    reachable, unreachable = ranking
+    assert reachable.failures == 0
+    assert reachable.median is not None
+    assert unreachable.failures == 3
+    assert unreachable.median is None
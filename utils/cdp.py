@@ -0,0 +1,246 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import threading
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from utils.logger import log
+
+DEFAULT_COMMAND_TIMEOUT = 10  # seconds
+DEFAULT_LOAD_TIMEOUT = 10
+DEFAULT_LOAD_EVENT = "Page.domContentEventFired"
+
+
+class CDPError(Exception):
+    pass
+
+
+class CDPConnection:
+    """A DevTools protocol connection to the browser over a single websocket.
+
+    Commands are awaitable and matched to their responses by id.  Events are delivered to queues
+    registered per (method, session), so several pages can share the connection when attached
+    with flattened sessions.
+    """
+
+    def __init__(self, ws_url):
+        self.ws_url = ws_url
+        self.http = None
+        self.ws = None
+        self.reader = None
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.listeners = {}
+
+    async def connect(self):
+        self.http = aiohttp.ClientSession()
+        self.ws = await self.http.ws_connect(self.ws_url, max_msg_size=0)
+        self.reader = asyncio.ensure_future(self.read_messages())
+        return self
+
+    async def close(self):
+        if self.reader:
+            self.reader.cancel()
+        if self.ws:
+            await self.ws.close()
+        if self.http:
+            await self.http.close()
+
+    @property
+    def closed(self):
+        return self.ws is None or self.ws.closed
+
+    async def read_messages(self):
+        try:
+            async for message in self.ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                data = json.loads(message.data)
+                if "id" in data:
+                    future = self.pending.pop(data["id"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in data:
+                        future.set_exception(
+                            CDPError(data["error"].get("message", "unknown error"))
+                        )
+                    else:
+                        future.set_result(data.get("result", {}))
+                else:
+                    key = (data.get("method"), data.get("sessionId"))
+                    for queue in self.listeners.get(key, []):
+                        queue.put_nowait(data.get("params", {}))
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("DevTools connection closed"))
+            self.pending.clear()
+
+    async def send(
+        self, method, params=None, session_id=None, timeout=DEFAULT_COMMAND_TIMEOUT
+    ):
+        if self.closed:
+            raise CDPError("DevTools connection closed")
+        message_id = next(self.ids)
+        future = asyncio.get_event_loop().create_future()
+        self.pending[message_id] = future
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        try:
+            await self.ws.send_str(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(message_id, None)
+
+    @asynccontextmanager
+    async def subscribe(self, method, session_id=None):
+        """Queues every `method` event for the session while the context is open"""
+        queue = asyncio.Queue()
+        key = (method, session_id)
+        self.listeners.setdefault(key, []).append(queue)
+        try:
+            yield queue
+        finally:
+            self.listeners[key].remove(queue)
+            if not self.listeners[key]:
+                del self.listeners[key]
+
+
+class CDPPage:
+    """A browser tab driven through a flattened DevTools session"""
+
+    def __init__(self, connection, target_id, session_id):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def attach(cls, connection, target_id):
+        result = await connection.send(
+            "Target.attachToTarget", {"targetId": target_id, "flatten": True}
+        )
+        page = cls(connection, target_id, result["sessionId"])
+        await page.send("Page.enable")
+        return page
+
+    async def send(self, method, params=None, timeout=DEFAULT_COMMAND_TIMEOUT):
+        return await self.connection.send(
+            method, params, session_id=self.session_id, timeout=timeout
+        )
+
+    def subscribe(self, method):
+        return self.connection.subscribe(method, session_id=self.session_id)
+
+    async def wait_for_event(self, method, timeout=DEFAULT_COMMAND_TIMEOUT):
+        async with self.subscribe(method) as events:
+            return await asyncio.wait_for(events.get(), timeout)
+
+    async def navigate(
+        self, url, wait_event=DEFAULT_LOAD_EVENT, timeout=DEFAULT_LOAD_TIMEOUT
+    ):
+        """Navigates and waits for `wait_event`, instead of polling the page for a change"""
+        async with self.subscribe(wait_event) as events:
+            result = await self.send("Page.navigate", {"url": url}, timeout=timeout)
+            if result.get("errorText"):
+                raise CDPError(f"Navigation to {url} failed: {result['errorText']}")
+            return await asyncio.wait_for(events.get(), timeout)
+
+    async def evaluate(self, expression, timeout=DEFAULT_COMMAND_TIMEOUT):
+        result = await self.send(
+            "Runtime.evaluate",
+            {"expression": expression, "returnByValue": True, "awaitPromise": True},
+            timeout=timeout,
+        )
+        if "exceptionDetails" in result:
+            raise CDPError(result["exceptionDetails"].get("text", "script failed"))
+        return result.get("result", {}).get("value")
+
+    async def query_xpath(self, xpath, timeout=DEFAULT_COMMAND_TIMEOUT):
+        """Returns the outer HTML of every node matching an XPath"""
+        return await self.evaluate(
+            "(function() {"
+            f"var result = document.evaluate({json.dumps(xpath)}, document, null, "
+            "XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);"
+            "var nodes = [];"
+            "for (var i = 0; i < result.snapshotLength; i++) {"
+            "nodes.push(result.snapshotItem(i).outerHTML);"
+            "}"
+            "return nodes;"
+            "})()",
+            timeout=timeout,
+        )
+
+    async def get_html(self, timeout=DEFAULT_COMMAND_TIMEOUT):
+        return await self.evaluate("document.documentElement.outerHTML", timeout)
+
+    async def get_title(self, timeout=DEFAULT_COMMAND_TIMEOUT):
+        return await self.evaluate("document.title", timeout)
+
+
+async def get_browser_ws_url(debugger_address):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"http://{debugger_address}/json/version") as response:
+            return (await response.json(content_type=None))["webSocketDebuggerUrl"]
+
+
+async def attach_to_page(debugger_address, target_id):
+    """Opens a connection to the browser listening on `debugger_address` and attaches to a tab"""
+    connection = CDPConnection(await get_browser_ws_url(debugger_address))
+    await connection.connect()
+    try:
+        return await CDPPage.attach(connection, target_id)
+    except Exception:
+        await connection.close()
+        raise
+
+
+class EventLoopThread:
+    """Runs an asyncio event loop in a background thread so synchronous code can use coroutines.
+
+    `run` blocks until the coroutine finishes and cancels it if `timeout` passes first, so a
+    deadline on the caller's side is also a deadline on the work.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def run(self, coroutine, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def submit(self, coroutine):
+        """Schedules a coroutine without waiting for it, returning a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        log.debug("Stopped the DevTools event loop")
@@ -0,0 +1,162 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from utils.logger import log
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 2  # seconds a check can wait in memory before it is written
+DEFAULT_RETENTION_DAYS = 14
+RETENTION_INTERVAL = 3600  # seconds between purges of old checks
+
+CHECK_COLUMNS = [
+    ("time", "REAL NOT NULL"),
+    ("asin", "TEXT NOT NULL"),
+    ("outcome", "TEXT NOT NULL"),
+    ("latency", "REAL"),
+    ("offers", "INTEGER"),
+    ("price", "REAL"),
+    ("shipping", "REAL"),
+    ("condition", "TEXT"),
+    ("reserve_min", "REAL"),
+    ("reserve_max", "REAL"),
+]
+SCHEMA = [
+    f"CREATE TABLE IF NOT EXISTS stock_checks "
+    f"({', '.join(f'{name} {kind}' for name, kind in CHECK_COLUMNS)})",
+    "CREATE INDEX IF NOT EXISTS stock_checks_asin_time ON stock_checks (asin, time)",
+    "CREATE INDEX IF NOT EXISTS stock_checks_time ON stock_checks (time)",
+]
+INSERT = (
+    f"INSERT INTO stock_checks ({', '.join(name for name, _ in CHECK_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in CHECK_COLUMNS)})"
+)
+
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    # WAL lets the stats command read while the bot writes
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.commit()
+    return connection
+
+
+def read_checks(path, since=0, until=None):
+    """Yields the stock checks in a time window as dicts, oldest first"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+    try:
+        rows = connection.execute(
+            "SELECT * FROM stock_checks WHERE time >= ? AND time < ? ORDER BY time",
+            (since, until if until is not None else float("inf")),
+        )
+        for row in rows:
+            yield dict(row)
+    finally:
+        connection.close()
+
+
+class CheckJournal:
+    """Keeps every stock check in a SQLite database.
+
+    `record` only queues the check, a writer thread inserts them in batches of up to
+    `batch_size` or every `flush_interval` seconds, so the check loop never waits on the disk.
+    Checks older than `retention_days` are purged at startup and then hourly.
+    """
+
+    def __init__(
+        self,
+        path,
+        batch_size=DEFAULT_BATCH_SIZE,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+        retention_days=DEFAULT_RETENTION_DAYS,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.queue = queue.Queue()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(
+            target=self.writer, name="check-journal", daemon=True
+        )
+        self.thread.start()
+
+    def record(self, asin, outcome, **fields):
+        row = {"time": time.time(), "asin": asin, "outcome": outcome, **fields}
+        self.queue.put(tuple(row.get(name) for name, _ in CHECK_COLUMNS))
+
+    def close(self):
+        """Writes out whatever is still queued"""
+        self.queue.put(None)
+        self.thread.join()
+
+    def writer(self):
+        try:
+            connection = connect(self.path)
+        except sqlite3.Error as e:
+            log.error(f"Could not open the stock check journal {self.path}: {e}")
+            return
+        last_purge = 0
+        done = False
+        while not done:
+            batch = []
+            deadline = time.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    row = self.queue.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    done = True
+                    break
+                batch.append(row)
+            try:
+                if batch:
+                    connection.executemany(INSERT, batch)
+                if time.time() - last_purge > RETENTION_INTERVAL:
+                    last_purge = time.time()
+                    self.purge(connection)
+                connection.commit()
+            except sqlite3.Error as e:
+                log.debug(f"Dropped {len(batch)} stock check(s): {e}")
+        connection.close()
+
+    def purge(self, connection):
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        deleted = connection.execute(
+            "DELETE FROM stock_checks WHERE time < ?", (cutoff,)
+        ).rowcount
+        if deleted:
+            log.debug(
+                f"Purged {deleted} stock check(s) older than {self.retention_days} days"
+            )
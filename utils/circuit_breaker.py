@@ -0,0 +1,121 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import random
+import time
+from collections import deque
+from enum import Enum
+
+from utils.logger import log
+
+DEFAULT_WINDOW = 120  # seconds of history used to judge the error rate
+DEFAULT_MIN_CALLS = 5
+DEFAULT_FAILURE_RATE = 0.5
+DEFAULT_BASE_BACKOFF = 30
+DEFAULT_MAX_BACKOFF = 600
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """Stops calls to a host that keeps failing.
+
+    Outcomes are kept for a sliding time window.  Once there are at least `min_calls` outcomes
+    and the failure rate reaches `failure_rate` the breaker opens and callers should wait
+    `wait_time()` seconds.  The backoff doubles each time the breaker re-opens and is jittered
+    so restarts don't line up.  After the backoff a single half-open call is allowed through:
+    success closes the breaker, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name,
+        window=DEFAULT_WINDOW,
+        min_calls=DEFAULT_MIN_CALLS,
+        failure_rate=DEFAULT_FAILURE_RATE,
+        base_backoff=DEFAULT_BASE_BACKOFF,
+        max_backoff=DEFAULT_MAX_BACKOFF,
+        clock=time.time,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.outcomes = deque()
+        self.state = BreakerState.CLOSED
+        self.open_count = 0
+        self.open_until = 0
+
+    def wait_time(self):
+        """Seconds to wait before the next call is allowed, moving to half-open when it's time"""
+        if self.state == BreakerState.OPEN:
+            remaining = self.open_until - self.clock()
+            if remaining > 0:
+                return remaining
+            self.state = BreakerState.HALF_OPEN
+            log.info(f"{self.name}: trying a single probe to see if things are better")
+        return 0
+
+    def record(self, success):
+        """Records the outcome of a call.  Returns True if this outcome opened the breaker"""
+        now = self.clock()
+        if self.state == BreakerState.HALF_OPEN:
+            if success:
+                log.info(f"{self.name}: probe succeeded, resuming")
+                self.close()
+                return False
+            self.trip(now)
+            return True
+        self.outcomes.append((now, success))
+        while self.outcomes and self.outcomes[0][0] < now - self.window:
+            self.outcomes.popleft()
+        if self.state == BreakerState.CLOSED and len(self.outcomes) >= self.min_calls:
+            failures = sum(1 for _, ok in self.outcomes if not ok)
+            if failures / len(self.outcomes) >= self.failure_rate:
+                self.trip(now)
+                return True
+        return False
+
+    def trip(self, now):
+        backoff = min(self.base_backoff * 2**self.open_count, self.max_backoff)
+        # Jitter within the upper half keeps the pause meaningful but unpredictable
+        backoff = random.uniform(backoff / 2, backoff)
+        self.open_count += 1
+        self.open_until = now + backoff
+        self.state = BreakerState.OPEN
+        self.outcomes.clear()
+        log.warning(
+            f"{self.name}: too many failures, pausing for {backoff:.0f} seconds"
+        )
+
+    def close(self):
+        self.state = BreakerState.CLOSED
+        self.open_count = 0
+        self.outcomes.clear()
+
+    @property
+    def is_open(self):
+        return self.state != BreakerState.CLOSED
@@ -17,11 +17,15 @@
 #      The author may be contacted through the project's GitHub, at:
 #      https://github.com/Hari-Nagarajan/fairgame
 
+import asyncio
+import queue
+import threading
 import time
 
 from pypresence import Presence
 
 from utils.logger import log
+from utils.startup import timed_stage
 from utils.version import version
 
 FAILS_BETWEEN_RETRY = 5
@@ -31,19 +35,43 @@ client_id = "783592971903696907"
 enabled = True
 connected = False
 failure_count = 0
-RPC = Presence(client_id=client_id)
+# Created on the presence thread: the client runs its own asyncio loop, which must only ever be
+# run from the thread that made it
+RPC = None
+# States waiting for the presence thread to send them
+pending_states = queue.Queue()
 
-try:
-    RPC.connect()
-    connected = True
-except:
-    # Eat the exception to allow main app processing to continue
-    connected = False
-    pass
+
+def connect():
+    global connected
+    try:
+        RPC.connect()
+        connected = True
+    except Exception as e:
+        # Eat the exception to allow main app processing to continue
+        log.debug(f"Could not connect to Discord Presence: {e}")
+        connected = False
+
+
+def run_presence():
+    """Owns the Discord client: connects, then sends the states queued by send_update"""
+    global RPC
+    # Connecting to Discord can take a while, it happens in the background
+    with timed_stage("presence"):
+        try:
+            RPC = Presence(client_id=client_id, loop=asyncio.new_event_loop())
+        except Exception as e:
+            log.debug(f"Discord Presence is not available: {e}")
+            return
+        connect()
+    update("Spinning up")
+    while True:
+        update(pending_states.get())
 
 
 def start_presence():
-    send_update("Spinning up")
+    if enabled:
+        threading.Thread(target=run_presence, name="presence", daemon=True).start()
 
 
 def buy_update():
@@ -55,39 +83,37 @@ def searching_update():
 
 
 def send_update(state):
+    # Only process messages if the user has this enabled
+    if enabled:
+        pending_states.put(state)
+
+
+def update(state):
     global connected
     global failure_count
 
-    if enabled:
-        # Only process messages if the user has this enabled
-        if connected:
-            # Only try to send messages if the connection is available
-            try:
-                RPC.update(
-                    large_image="fairgame",
-                    state=state,
-                    details=f"{version}",
-                    start=start_time,
-                )
-                # Reset the failure count on every successful update
-                failure_count = 0
-                return
-            except:
-                # Track the number of failures
-                failure_count += 1
-                # Eat the exception to allow main app processing to continue
-                pass
-        else:
+    if connected:
+        # Only try to send messages if the connection is available
+        try:
+            RPC.update(
+                large_image="fairgame",
+                state=state,
+                details=f"{version}",
+                start=start_time,
+            )
+            # Reset the failure count on every successful update
+            failure_count = 0
+            return
+        except Exception as e:
+            # Track the number of failures
             failure_count += 1
-
-        # Retry the Discord connection every now and then in case it was disconnected and is back
-        if failure_count % FAILS_BETWEEN_RETRY == 0:
-            try:
-                RPC.connect()
-                connected = True
-                log.debug("Reconnected to Discord Presence")
-            except Exception as e:
-                # Well, we tried.
-                log.debug(f"Failed reconnect attempt. {e}")
-                connected = False
-                pass
+            # Eat the exception to allow main app processing to continue
+            log.debug(f"Discord Presence update failed: {e}")
+    else:
+        failure_count += 1
+
+    # Retry the Discord connection every now and then in case it was disconnected and is back
+    if failure_count % FAILS_BETWEEN_RETRY == 0:
+        connect()
+        if connected:
+            log.debug("Reconnected to Discord Presence")
@@ -0,0 +1,216 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+
+import json
+import os
+import socket
+import ssl
+import statistics
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import dns.resolver
+
+from utils.logger import log
+
+DEFAULT_DNS_DEADLINE = 3  # seconds for all servers to answer
+DEFAULT_PROBE_PORT = 443
+DEFAULT_PROBE_SAMPLES = 5
+DEFAULT_PROBE_TIMEOUT = 2
+
+EndpointLatency = namedtuple(
+    "EndpointLatency", ["address", "median", "jitter", "tls_median", "failures"]
+)
+
+
+def resolve_with(server, domain, timeout, port=53):
+    """A-record lookup against a single DNS server"""
+    resolver = dns.resolver.Resolver(configure=False)
+    resolver.nameservers = [server]
+    resolver.port = port
+    resolver.timeout = resolver.lifetime = timeout
+    return [rdata.address for rdata in resolver.resolve(domain)]
+
+
+def resolve_domain(domain, dns_servers, deadline=DEFAULT_DNS_DEADLINE, port=53):
+    """Asks every server at once, keeping whatever answered within the deadline.  `dns_servers`
+    maps a provider name to its server addresses.  Returns the distinct addresses and the number
+    of answers they came from"""
+    servers = [
+        (provider, server)
+        for provider, addresses in dns_servers.items()
+        for server in addresses
+    ]
+    resolutions = 0
+    endpoints = set()
+    if not servers:
+        return endpoints, resolutions
+    executor = ThreadPoolExecutor(max_workers=len(servers))
+    futures = {
+        executor.submit(resolve_with, server, domain, deadline, port): (
+            provider,
+            server,
+        )
+        for provider, server in servers
+    }
+    done, not_done = wait(futures, timeout=deadline)
+    # Don't wait on servers that missed the deadline
+    executor.shutdown(wait=False)
+    for future in done:
+        provider, server = futures[future]
+        try:
+            addresses = future.result()
+        except Exception as e:
+            log.warning(
+                f"Unable to resolve using {provider} server {server} due to: {e}"
+            )
+            continue
+        for address in addresses:
+            endpoints.add(address)
+            resolutions += 1
+            log.debug(f"{domain} resolves to {address} via {server}")
+    for future in not_done:
+        provider, server = futures[future]
+        log.warning(f"{provider} server {server} did not answer within {deadline}s")
+    return endpoints, resolutions
+
+
+def measure_connect(address, port, timeout, server_name=None, ssl_context=None):
+    """Times a TCP connect, which takes one round trip, and optionally the TLS handshake on top
+    of it.  Returns (connect seconds, handshake seconds or None)"""
+    start = time.perf_counter()
+    with socket.create_connection((address, port), timeout=timeout) as sock:
+        connected = time.perf_counter()
+        if ssl_context is None:
+            return connected - start, None
+        with ssl_context.wrap_socket(sock, server_hostname=server_name):
+            return connected - start, time.perf_counter() - connected
+
+
+def probe_endpoint(
+    address,
+    port=DEFAULT_PROBE_PORT,
+    samples=DEFAULT_PROBE_SAMPLES,
+    timeout=DEFAULT_PROBE_TIMEOUT,
+    server_name=None,
+    ssl_context=None,
+):
+    """Measures an endpoint `samples` times.  Jitter is the mean difference between
+    consecutive connect times"""
+    connects = []
+    handshakes = []
+    failures = 0
+    for _ in range(samples):
+        try:
+            connect, handshake = measure_connect(
+                address, port, timeout, server_name, ssl_context
+            )
+        except (OSError, ssl.SSLError) as e:
+            log.debug(f"Probe of {address}:{port} failed: {e}")
+            failures += 1
+            continue
+        connects.append(connect)
+        if handshake is not None:
+            handshakes.append(handshake)
+    if not connects:
+        return EndpointLatency(address, None, None, None, failures)
+    jitter = (
+        statistics.mean(abs(a - b) for a, b in zip(connects, connects[1:]))
+        if len(connects) > 1
+        else 0.0
+    )
+    return EndpointLatency(
+        address,
+        statistics.median(connects),
+        jitter,
+        statistics.median(handshakes) if handshakes else None,
+        failures,
+    )
+
+
+def load_ranking(path, domain, max_age):
+    """The cached ranking for a domain, None if there is none or it is older than `max_age`
+    seconds"""
+    try:
+        with open(path) as f:
+            entry = json.load(f).get(domain)
+    except (OSError, ValueError):
+        return None
+    if not entry or time.time() - entry["time"] > max_age:
+        return None
+    return [EndpointLatency(*result) for result in entry["ranking"]]
+
+
+def save_ranking(path, domain, ranking):
+    try:
+        with open(path) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache[domain] = {"time": time.time(), "ranking": [list(r) for r in ranking]}
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def rank_endpoints(
+    addresses,
+    port=DEFAULT_PROBE_PORT,
+    samples=DEFAULT_PROBE_SAMPLES,
+    timeout=DEFAULT_PROBE_TIMEOUT,
+    server_name=None,
+    tls=True,
+    ssl_context=None,
+):
+    """Probes all endpoints at once and returns the most reliable and fastest first: by failed
+    connects, then median connect time, then jitter.  Endpoints that never connected come last.
+    With `tls` the handshake is timed too, `ssl_context` allows probing servers with
+    certificates the default context rejects
+    """
+    addresses = list(addresses)
+    if not addresses:
+        return []
+    if tls and ssl_context is None:
+        ssl_context = ssl.create_default_context()
+    with ThreadPoolExecutor(max_workers=len(addresses)) as executor:
+        results = list(
+            executor.map(
+                lambda address: probe_endpoint(
+                    address,
+                    port,
+                    samples,
+                    timeout,
+                    server_name,
+                    ssl_context if tls else None,
+                ),
+                addresses,
+            )
+        )
+    return sorted(
+        results,
+        key=lambda result: (
+            result.median is None,
+            result.failures,
+            result.median or 0,
+            result.jitter or 0,
+        ),
+    )
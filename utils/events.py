@@ -0,0 +1,122 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import queue
+import threading
+import time
+
+from utils.logger import log
+
+
+class Event:
+    """Base class for things that happen while the bot runs.  Subscribers pick events by class"""
+
+    def __init__(self, message=""):
+        self.message = message
+        self.time = time.time()
+        # PNG bytes taken by the publisher, subscribers must not touch the browser themselves
+        self.screenshot = None
+
+    @property
+    def name(self):
+        return type(self).__name__
+
+    def __repr__(self):
+        return f"{self.name}({self.message!r})"
+
+
+class StockFound(Event):
+    def __init__(self, asin, offering_id=None, message=""):
+        super().__init__(message or f"Found Stock ASIN:{asin}")
+        self.asin = asin
+        self.offering_id = offering_id
+
+
+class AddedToCart(Event):
+    def __init__(self, asin, message=""):
+        super().__init__(message or f"Added {asin} to cart")
+        self.asin = asin
+
+
+class AddToCartFailed(Event):
+    def __init__(self, asin, message="Failed Add to Cart"):
+        super().__init__(message)
+        self.asin = asin
+
+
+class OrderPlaced(Event):
+    def __init__(self, elapsed=None, message="Order placed."):
+        super().__init__(message)
+        self.elapsed = elapsed
+
+
+class CheckoutFailed(Event):
+    def __init__(self, message, alarm=False):
+        super().__init__(message)
+        self.alarm = alarm
+
+
+class Subscriber:
+    def __init__(self, name, event_types, handler):
+        self.name = name
+        self.event_types = tuple(event_types)
+        self.handler = handler
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            event = self.queue.get()
+            try:
+                self.handler(event)
+            except Exception as e:
+                log.error(f"Event subscriber {self.name} failed on {event}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+class EventBus:
+    """In-process publish/subscribe.  Every subscriber has its own queue and worker thread, so
+    publishing never waits on a side effect and a slow subscriber only delays itself"""
+
+    def __init__(self):
+        self.subscribers = []
+
+    def subscribe(self, name, event_types, handler):
+        subscriber = Subscriber(name, event_types, handler)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def publish(self, event):
+        log.debug(f"Event: {event}")
+        for subscriber in self.subscribers:
+            if isinstance(event, subscriber.event_types):
+                subscriber.queue.put(event)
+
+    def drain(self, timeout=None):
+        """Waits for subscribers to finish the events published so far.  Returns False if the
+        timeout passed first"""
+        deadline = None if timeout is None else time.time() + timeout
+        for subscriber in self.subscribers:
+            while subscriber.queue.unfinished_tasks:
+                if deadline is not None and time.time() > deadline:
+                    return False
+                time.sleep(0.05)
+        return True
@@ -0,0 +1,270 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+from fnmatch import fnmatch
+from urllib.parse import urljoin
+
+from lxml import html
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    StaleElementReferenceException,
+)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+BLANK_PAGE = "<html><head><title></title></head><body></body></html>"
+FAKE_WINDOW_HANDLE = "fake-window"
+# Fixture pages are always fully loaded
+DEFAULT_SCRIPTS = {"document.readyState": "complete"}
+
+
+def load_fixture(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class FakeWebElement:
+    """An lxml node that behaves like a Selenium WebElement.  Goes stale when the driver
+    navigates away from the page it was found on, like the real thing"""
+
+    def __init__(self, driver, node):
+        self.driver = driver
+        self.node = node
+        self.generation = driver.generation
+        self.value = node.get("value", "")
+
+    def check_stale(self):
+        if self.generation != self.driver.generation:
+            raise StaleElementReferenceException("element is not attached to the page")
+
+    @property
+    def text(self):
+        self.check_stale()
+        return " ".join(self.node.text_content().split())
+
+    @property
+    def tag_name(self):
+        self.check_stale()
+        return self.node.tag
+
+    def get_attribute(self, name):
+        self.check_stale()
+        if name == "innerHTML":
+            inner = self.node.text or ""
+            return inner + "".join(
+                html.tostring(child, encoding="unicode") for child in self.node
+            )
+        if name == "outerHTML":
+            return html.tostring(self.node, encoding="unicode")
+        if name in ("textContent", "innerText"):
+            return self.node.text_content()
+        if name == "value":
+            return self.value
+        return self.node.get(name)
+
+    def is_displayed(self):
+        self.check_stale()
+        for node in [self.node] + list(self.node.iterancestors()):
+            style = (node.get("style") or "").replace(" ", "")
+            if "display:none" in style or node.get("hidden") is not None:
+                return False
+        return self.node.get("type") != "hidden"
+
+    def is_enabled(self):
+        self.check_stale()
+        return self.node.get("disabled") is None
+
+    def click(self):
+        self.check_stale()
+        self.driver.click(self)
+
+    def clear(self):
+        self.check_stale()
+        self.value = ""
+
+    def send_keys(self, *keys):
+        self.check_stale()
+        text = "".join(keys)
+        if Keys.RETURN in text or Keys.ENTER in text:
+            self.value += text.replace(Keys.RETURN, "").replace(Keys.ENTER, "")
+            self.driver.click(self)
+        else:
+            self.value += text
+
+    def find_element_by_xpath(self, xpath):
+        return self.driver.first(self.find_elements_by_xpath(xpath), xpath)
+
+    def find_elements_by_xpath(self, xpath):
+        self.check_stale()
+        return self.driver.wrap(self.node.xpath(xpath))
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current_window_handle = handle
+
+
+class FakeWebDriver:
+    """Subset of the Selenium WebDriver API used by the Amazon store, backed by lxml.
+
+    `pages` maps URLs, or fnmatch patterns of URLs, to HTML.  `transitions` scripts what a click
+    does: keys are XPaths, or (URL pattern, XPath) pairs to limit them to a page, and values are
+    the URL the click leads to.  Clicks without a scripted transition follow links and form
+    actions.  `scripts` maps a snippet of JavaScript to the value, or a callable taking the
+    driver and script arguments, that execute_script should return, on top of DEFAULT_SCRIPTS.
+    Unknown URLs load a blank page and unknown scripts return None.
+    """
+
+    def __init__(self, pages, transitions=None, scripts=None, start_url="about:blank"):
+        self.pages = pages
+        self.transitions = transitions or {}
+        self.scripts = dict(scripts or {})
+        for snippet, result in DEFAULT_SCRIPTS.items():
+            self.scripts.setdefault(snippet, result)
+        self.generation = 0
+        self.history = []
+        self.clicks = []
+        self.cookies = []
+        self.current_url = None
+        self.tree = None
+        self.window_handles = [FAKE_WINDOW_HANDLE]
+        self.current_window_handle = FAKE_WINDOW_HANDLE
+        self.switch_to = FakeSwitchTo(self)
+        self.capabilities = {}
+        self.load(start_url)
+
+    # Navigation
+
+    def get_page_html(self, url):
+        if url in self.pages:
+            return self.pages[url]
+        for pattern, page in self.pages.items():
+            if fnmatch(url, pattern):
+                return page
+        return BLANK_PAGE
+
+    def load(self, url):
+        self.current_url = url
+        self.tree = html.fromstring(self.get_page_html(url))
+        self.generation += 1
+        self.history.append(url)
+
+    def get(self, url):
+        self.load(url)
+
+    def refresh(self):
+        self.load(self.current_url)
+
+    def click(self, element):
+        self.clicks.append(element.node)
+        for key, target in self.transitions.items():
+            url_pattern, xpath = key if isinstance(key, tuple) else ("*", key)
+            if fnmatch(
+                self.current_url, url_pattern
+            ) and element.node in self.tree.xpath(xpath):
+                self.load(target)
+                return
+        node = element.node
+        if node.tag == "a" and node.get("href"):
+            self.load(urljoin(self.current_url, node.get("href")))
+            return
+        form = next(node.iterancestors("form"), None)
+        if form is not None and form.get("action"):
+            self.load(urljoin(self.current_url, form.get("action")))
+
+    @property
+    def title(self):
+        titles = self.tree.xpath("//title")
+        return titles[0].text_content().strip() if titles else ""
+
+    @property
+    def page_source(self):
+        return html.tostring(self.tree, encoding="unicode")
+
+    # Element lookup
+
+    def wrap(self, nodes):
+        return [FakeWebElement(self, node) for node in nodes if hasattr(node, "tag")]
+
+    @staticmethod
+    def first(elements, description):
+        if not elements:
+            raise NoSuchElementException(f"Unable to locate element: {description}")
+        return elements[0]
+
+    def find_elements_by_xpath(self, xpath):
+        return self.wrap(self.tree.xpath(xpath))
+
+    def find_element_by_xpath(self, xpath):
+        return self.first(self.find_elements_by_xpath(xpath), xpath)
+
+    def find_element_by_id(self, element_id):
+        return self.find_element_by_xpath(f"//*[@id='{element_id}']")
+
+    def find_element_by_tag_name(self, tag):
+        return self.find_element_by_xpath(f"//{tag}")
+
+    def find_elements(self, by=By.XPATH, value=None):
+        if by == By.ID:
+            return self.find_elements_by_xpath(f"//*[@id='{value}']")
+        if by == By.TAG_NAME:
+            return self.find_elements_by_xpath(f"//{value}")
+        if by == By.CLASS_NAME:
+            return self.find_elements_by_xpath(
+                f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')]"
+            )
+        return self.find_elements_by_xpath(value)
+
+    def find_element(self, by=By.XPATH, value=None):
+        return self.first(self.find_elements(by, value), value)
+
+    # Scripts and browser plumbing
+
+    def execute_script(self, script, *args):
+        for snippet, result in self.scripts.items():
+            if snippet in script:
+                return result(self, *args) if callable(result) else result
+        return None
+
+    def execute_async_script(self, script, *args):
+        return self.execute_script(script, *args)
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def set_script_timeout(self, timeout):
+        pass
+
+    def get_log(self, log_type):
+        return []
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def save_screenshot(self, filename):
+        return True
+
+    def get_screenshot_as_png(self):
+        return b""
+
+    def quit(self):
+        pass
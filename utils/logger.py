@@ -35,22 +35,6 @@ if not os.path.exists(LOG_DIR):
 
 LOG_FILE_PATH = os.path.join(LOG_DIR, LOG_FILE_NAME)
 
-# This check *must* be executed before logging.basicConfig because, at least on Windows,
-# basicConfig creates a lock on the log file that prevents renaming.  Possibly a workaround
-# but putting this first seems to dodge the issue
-if os.path.isfile(LOG_FILE_PATH):
-    # Create a transient handler to do the rollover for us on startup.  This won't
-    # be added to the logger as a handler... just used to roll the log on startup.
-    rollover_handler = handlers.RotatingFileHandler(
-        LOG_FILE_PATH, backupCount=10, maxBytes=100 * 1024 * 1024
-    )
-    # Prior log file exists, so roll it to get a clean log for this run
-    try:
-        rollover_handler.doRollover()
-    except Exception:
-        # Eat it since it's *probably* non-fatal and since we're *probably* still able to log to the prior file
-        pass
-
 logging.basicConfig(
     filename=LOG_FILE_PATH,
     level=logging.DEBUG,
@@ -67,3 +51,24 @@ stream_handler.setFormatter(logging.Formatter(FORMAT))
 log.addHandler(stream_handler)
 
 coloredlogs.install(LOGLEVEL, logger=log, fmt=FORMAT)
+
+
+def rollover_log():
+    """Moves the log of the previous run to fairgame.log.1 (and so on) so this run gets a clean
+    one.  Called by the commands that write the log, not the ones that read it"""
+    if not os.path.isfile(LOG_FILE_PATH):
+        return
+    # At least on Windows, an open file can't be renamed.  Closed file handlers open the new
+    # file with their next record
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            handler.close()
+    # A transient handler does the rollover for us, it is never added to a logger
+    rollover_handler = handlers.RotatingFileHandler(
+        LOG_FILE_PATH, backupCount=10, maxBytes=100 * 1024 * 1024, delay=True
+    )
+    try:
+        rollover_handler.doRollover()
+    except Exception:
+        # Eat it since it's *probably* non-fatal and since we're *probably* still able to log to the prior file
+        pass
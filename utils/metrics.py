@@ -0,0 +1,174 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from utils.logger import log
+
+# Structured records are written to the debug log so they can be mined later without
+# a separate file.  A record looks like:  METRIC|timing|stock_check|0.8123|asin=B07JH53M4T
+METRIC_RECORD_PREFIX = "METRIC"
+MAX_SAMPLES = 1000
+# Labels that make values incomparable, so every value of one gets its own summary line
+SUMMARY_LABELS = ("lean",)
+
+
+def format_record(kind, name, value, labels=None):
+    record = f"{METRIC_RECORD_PREFIX}|{kind}|{name}|{value}"
+    if labels:
+        record += "|" + ",".join(f"{k}={v}" for k, v in labels.items())
+    return record
+
+
+def parse_record(message):
+    """Returns (kind, name, value, labels) for a structured metric record, or None"""
+    if not message.startswith(METRIC_RECORD_PREFIX + "|"):
+        return None
+    parts = message.rstrip("\n").split("|")
+    if len(parts) < 4:
+        return None
+    try:
+        value = float(parts[3])
+    except ValueError:
+        return None
+    labels = {}
+    if len(parts) > 4 and parts[4]:
+        for pair in parts[4].split(","):
+            key, _, label_value = pair.partition("=")
+            labels[key] = label_value
+    return parts[1], parts[2], value, labels
+
+
+def summary_key(name, labels):
+    """The name samples are kept and summarized under, such as page.offer.bytes[lean=True]"""
+    split = [f"{key}={labels[key]}" for key in SUMMARY_LABELS if key in labels]
+    return f"{name}[{','.join(split)}]" if split else name
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Metrics:
+    """Thread safe counters, gauges and sampled values (timings, sizes) for the running bot"""
+
+    def __init__(self, max_samples=MAX_SAMPLES):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.samples = defaultdict(lambda: deque(maxlen=max_samples))
+        self.units = {}
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def record_event(self, name, **labels):
+        """Counts an event and writes a structured record of it to the log"""
+        self.increment(name)
+        log.debug(format_record("event", name, 1, labels))
+
+    def set_gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def record_sample(self, name, value, unit="", **labels):
+        """Keeps a bounded history of a measured value, such as bytes transferred"""
+        key = summary_key(name, labels)
+        with self.lock:
+            self.samples[key].append(value)
+            self.units[key] = unit
+        kind = "timing" if unit == "s" else "sample"
+        log.debug(format_record(kind, name, round(value, 4), labels))
+
+    def record_timing(self, name, seconds, **labels):
+        self.record_sample(name, seconds, unit="s", **labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record_timing(name, time.time() - start, **labels)
+
+    def get_counter(self, name):
+        with self.lock:
+            return self.counters.get(name, 0)
+
+    def get_gauge(self, name, default=None):
+        with self.lock:
+            return self.gauges.get(name, default)
+
+    def get_samples(self, name):
+        with self.lock:
+            return list(self.samples.get(name, []))
+
+    def mean(self, name):
+        samples = self.get_samples(name)
+        if not samples:
+            return None
+        return sum(samples) / len(samples)
+
+    def percentile(self, name, pct):
+        return percentile(self.get_samples(name), pct)
+
+    def ratio(self, numerator, denominator):
+        """Ratio of two counters, None if the denominator has not been counted yet"""
+        with self.lock:
+            total = self.counters.get(denominator, 0)
+            if not total:
+                return None
+            return self.counters.get(numerator, 0) / total
+
+    def log_summary(self):
+        with self.lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            sample_names = list(self.samples.keys())
+            units = dict(self.units)
+        if not (counters or gauges or sample_names):
+            return
+        log.info(f"{'=' * 50}")
+        log.info("Run metrics:")
+        for name in sorted(counters):
+            log.info(f"--{name}: {counters[name]}")
+        for name in sorted(gauges):
+            log.info(f"--{name}: {gauges[name]}")
+        for name in sorted(sample_names):
+            samples = self.get_samples(name)
+            unit = units.get(name, "")
+            if samples:
+                log.info(
+                    f"--{name}: n={len(samples)} mean={sum(samples) / len(samples):.3f}{unit} "
+                    f"p50={percentile(samples, 50):.3f}{unit} p95={percentile(samples, 95):.3f}{unit}"
+                )
+        log.info(f"{'=' * 50}")
+
+
+metrics = Metrics()
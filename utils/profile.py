@@ -0,0 +1,119 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import os
+import shutil
+
+from utils.logger import log
+
+# Chrome rebuilds these on its own, so they are never worth copying or keeping around.  The HTTP
+# cache ("Cache") is kept, without it the first offer pages after a trim or restore load cold
+PROFILE_CACHE_DIRS = [
+    "Code Cache",
+    "GPUCache",
+    "ShaderCache",
+    "GrShaderCache",
+    "Service Worker",
+]
+# Copies also leave out the HTTP cache, it can be hundreds of MB and would make every standby
+# clone and snapshot slow.  The trade-off is that a standby browser or restored profile loads its
+# first offer pages cold
+PROFILE_CLONE_SKIP_DIRS = PROFILE_CACHE_DIRS + ["Cache"]
+# Only valid for the browser that created them, a copy would make Chrome think the profile is in use
+PROFILE_LOCK_FILES = [
+    "SingletonLock",
+    "SingletonSocket",
+    "SingletonCookie",
+    "lockfile",
+]
+
+
+def clone_profile(source, destination):
+    """Copies a browser profile, without caches and lock files, replacing anything at destination"""
+    if os.path.exists(destination):
+        shutil.rmtree(destination, ignore_errors=True)
+    try:
+        shutil.copytree(
+            source,
+            destination,
+            ignore=shutil.ignore_patterns(
+                *PROFILE_CLONE_SKIP_DIRS, *PROFILE_LOCK_FILES
+            ),
+        )
+    except shutil.Error as e:
+        # Files held open by a running browser can fail to copy, the rest is still usable
+        log.debug(f"{len(e.args[0])} profile file(s) could not be copied")
+
+
+def get_profile_size(path):
+    """Total size in bytes of the files in a profile"""
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                continue
+    return size
+
+
+def trim_profile(path):
+    """Deletes cache folders from a profile, keeping cookies, logins and settings.  Returns the
+    number of bytes freed"""
+    freed = 0
+    for root, dirs, _ in os.walk(path):
+        for name in [d for d in dirs if d in PROFILE_CACHE_DIRS]:
+            cache_path = os.path.join(root, name)
+            freed += get_profile_size(cache_path)
+            shutil.rmtree(cache_path, ignore_errors=True)
+            # Don't walk into what was just deleted
+            dirs.remove(name)
+    return freed
+
+
+def clear_crashed_exit(path):
+    """Marks the last session as closed normally, so Chrome doesn't offer to restore it.  The
+    Preferences file is only rewritten when the previous session actually crashed"""
+    path_to_prefs = os.path.join(path, "Default", "Preferences")
+    try:
+        with open(path_to_prefs, "rb") as f:
+            prefs = f.read()
+    except FileNotFoundError:
+        return False
+    if b'"Crashed"' not in prefs:
+        return False
+    temp_path = path_to_prefs + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(prefs.replace(b'"Crashed"', b'"Normal"'))
+    os.replace(temp_path, path_to_prefs)
+    return True
+
+
+def snapshot_profile(path, snapshot_path):
+    """Saves a slim copy of a known good profile that can be restored later"""
+    clone_profile(path, snapshot_path)
+    clear_crashed_exit(snapshot_path)
+
+
+def restore_profile(snapshot_path, path):
+    """Replaces a profile with a saved snapshot.  Returns False if there is no snapshot"""
+    if not os.path.isdir(snapshot_path):
+        return False
+    clone_profile(snapshot_path, path)
+    return True
@@ -0,0 +1,97 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import heapq
+import itertools
+import time
+
+DEFAULT_MAX_BACKOFF = 300  # seconds
+
+
+class ScheduledItem:
+    def __init__(self, key, interval, priority=0, payload=None):
+        self.key = key
+        self.interval = interval
+        self.priority = priority
+        self.payload = payload
+        self.failures = 0
+        self.next_due = 0
+        self.started = 0
+
+    def __repr__(self):
+        return f"ScheduledItem({self.key!r}, interval={self.interval}, priority={self.priority})"
+
+
+class PollScheduler:
+    """Heap based polling scheduler.
+
+    Each item is due `interval` seconds after its previous check *started*, so time spent in a
+    check is not added on top of the interval.  Checks are spaced at least `min_spacing` seconds
+    apart, which caps the overall request rate.  When several items are due at once the highest
+    priority goes first, so a priority item waits at most one spacing (plus the check in progress)
+    past its due time.  Failed checks back off exponentially up to `max_backoff`.
+    """
+
+    def __init__(self, min_spacing, max_backoff=DEFAULT_MAX_BACKOFF, clock=time.time):
+        self.min_spacing = min_spacing
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.heap = []
+        self.sequence = itertools.count()
+        self.last_start = None
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, item, due=None):
+        item.next_due = self.clock() if due is None else due
+        heapq.heappush(self.heap, (item.next_due, next(self.sequence), item))
+
+    def next_item(self):
+        """Returns the next item to check and how many seconds to wait before starting it"""
+        if not self.heap:
+            return None, 0
+        now = self.clock()
+        start_at = self.heap[0][0]
+        if self.last_start is not None:
+            start_at = max(start_at, self.last_start + self.min_spacing)
+        # Everything due by the time we may start competes on priority
+        ready = []
+        while self.heap and self.heap[0][0] <= start_at:
+            ready.append(heapq.heappop(self.heap))
+        ready.sort(key=lambda entry: (-entry[2].priority, entry[0], entry[1]))
+        for entry in ready[1:]:
+            heapq.heappush(self.heap, entry)
+        return ready[0][2], max(0.0, start_at - now)
+
+    def start(self, item):
+        item.started = self.last_start = self.clock()
+
+    def complete(self, item, success=True):
+        """Puts a checked item back on the schedule, backing off after failures"""
+        if success:
+            item.failures = 0
+            interval = item.interval
+        else:
+            item.failures += 1
+            interval = min(
+                item.interval * 2**item.failures, max(self.max_backoff, item.interval)
+            )
+        self.add(item, due=(item.started or self.clock()) + interval)
+        return interval
@@ -0,0 +1,90 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import gzip
+import html
+import json
+import queue
+import threading
+import time
+
+from utils.logger import log
+
+RECORD_VERSION = 1
+
+
+class SessionRecorder:
+    """Journals what the bot saw and decided into a gzip compressed JSON lines archive.
+
+    Records are plain dicts with a `type` and a timestamp `t`.  They are written by a background
+    thread, so recording costs the caller a queue put.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.file = gzip.open(path, "at", encoding="utf-8")
+        self.thread = threading.Thread(target=self.writer, daemon=True)
+        self.thread.start()
+        self.record("session", version=RECORD_VERSION)
+        log.info(f"Recording the session to {path}")
+
+    def record(self, record_type, **fields):
+        self.queue.put({"type": record_type, "t": round(time.time(), 4), **fields})
+
+    def writer(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    self.file.close()
+                    return
+                self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+                if self.queue.empty():
+                    # Keep the archive readable if the bot dies, without flushing every record
+                    self.file.flush()
+            except Exception as e:
+                log.debug(f"Could not write session record: {e}")
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+
+def read_session(path):
+    """Yields the records of a session archive, stopping quietly at a truncated end"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+        except EOFError:
+            return
+
+
+def snapshot_page(title, fragments):
+    """Rebuilds a minimal page from a recorded title and HTML fragments"""
+    return (
+        f"<html><head><title>{html.escape(title or '')}</title></head>"
+        f"<body>{''.join(fragments)}</body></html>"
+    )
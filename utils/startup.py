@@ -0,0 +1,84 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.logger import log
+from utils.metrics import metrics
+
+
+def record_stage(name, duration):
+    metrics.record_timing(f"startup.{name}", duration)
+    log.info(f"Startup: {name} took {duration:.2f}s")
+
+
+@contextmanager
+def timed_stage(name):
+    """Times a startup stage that runs in the foreground"""
+    start = time.time()
+    try:
+        yield
+    finally:
+        record_stage(name, time.time() - start)
+
+
+class StartupStage:
+    """A startup step running on its own daemon thread, so independent steps overlap and a
+    slow one (a network call, a browser launch) never holds up the rest"""
+
+    def __init__(self, name, target, *args, **kwargs):
+        self.name = name
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+        self.thread = threading.Thread(
+            target=self.run, name=f"startup-{name}", daemon=True
+        )
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        start = time.time()
+        try:
+            self.result = self.target(*self.args, **self.kwargs)
+        except Exception as e:
+            self.error = e
+        finally:
+            record_stage(self.name, time.time() - start)
+            self.done.set()
+
+    def wait(self, timeout=None):
+        """Returns what the stage returned, re-raising anything it raised"""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"Startup stage {self.name} did not finish in time")
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def start_stage(name, target, *args, **kwargs):
+    return StartupStage(name, target, *args, **kwargs).start()
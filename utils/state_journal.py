@@ -0,0 +1,146 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+
+import json
+import os
+import time
+
+from utils.logger import log
+
+# Appended records are folded back into a snapshot once there are this many
+DEFAULT_MAX_RECORDS = 1000
+
+
+def new_state():
+    return {"completed_groups": [], "in_flight": {}, "position": None}
+
+
+def apply_record(state, record):
+    kind = record.get("type")
+    if kind == "checkout_start":
+        state["in_flight"][record["asin"]] = record.get("time", 0)
+    elif kind == "checkout_end":
+        state["in_flight"].pop(record["asin"], None)
+        group = record.get("group")
+        if group and sorted(group) not in state["completed_groups"]:
+            state["completed_groups"].append(sorted(group))
+    elif kind == "position":
+        state["position"] = record["asin"]
+
+
+def load_state(path):
+    """Replays a journal.  A torn last line from a crash mid-write is skipped"""
+    state = new_state()
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    apply_record(state, json.loads(line))
+                except (ValueError, KeyError):
+                    log.debug(f"Skipping unreadable state journal line: {line!r}")
+    except FileNotFoundError:
+        pass
+    return state
+
+
+def snapshot_records(state):
+    records = [
+        {"type": "checkout_end", "asin": group[0], "group": group}
+        for group in state["completed_groups"]
+    ]
+    records += [
+        {"type": "checkout_start", "asin": asin, "time": started}
+        for asin, started in state["in_flight"].items()
+    ]
+    if state["position"]:
+        records.append({"type": "position", "asin": state["position"]})
+    return records
+
+
+class StateJournal:
+    """Append-only record of what the bot has done that a restart must not redo: groups that
+    were ordered, checkouts that were in progress and where the check cycle was.
+
+    Records that matter after a crash are fsync'd before returning.  The journal is compacted
+    into a snapshot of the current state when opened and whenever it grows past `max_records`.
+    Without a `path` the state is only kept in memory, for runs that must not touch the live
+    journal.
+    """
+
+    def __init__(self, path, max_records=DEFAULT_MAX_RECORDS):
+        self.path = path
+        self.max_records = max_records
+        self.state = load_state(path) if path else new_state()
+        self.file = None
+        self.records = 0
+        if path:
+            self.compact()
+
+    def append(self, record, sync=True):
+        apply_record(self.state, record)
+        if not self.path:
+            return
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        if sync:
+            os.fsync(self.file.fileno())
+        self.records += 1
+        if self.records > self.max_records:
+            self.compact()
+
+    def compact(self):
+        """Rewrites the journal as a snapshot of the current state, replacing it atomically"""
+        if self.file:
+            self.file.close()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        records = snapshot_records(self.state)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.file = open(self.path, "a")
+        self.records = len(records)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def checkout_started(self, asin):
+        self.append({"type": "checkout_start", "asin": asin, "time": time.time()})
+
+    def checkout_finished(self, asin, group=None):
+        """Closes out a checkout, `group` being the ASINs that are done if an order was placed"""
+        self.append({"type": "checkout_end", "asin": asin, "group": group})
+
+    def checked(self, asin):
+        # Losing the last position in a crash only costs a repeated check, so no fsync
+        self.append({"type": "position", "asin": asin}, sync=False)
+
+    def is_done(self, asins):
+        return sorted(asins) in self.state["completed_groups"]
+
+    def in_flight(self, asins):
+        return [asin for asin in asins if asin in self.state["in_flight"]]
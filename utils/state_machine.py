@@ -0,0 +1,123 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import time
+from collections import defaultdict
+
+from utils.metrics import metrics
+
+
+class StateMachine:
+    """Tracks a run through an explicit set of states.
+
+    Every `transition` to a different state records how long the previous state lasted as a
+    `<name>.transition` timing labelled with the source and target state.  Staying in the same
+    state, such as re-reading a page that is still loading, is not a new visit.  `deadlines` caps
+    the total time spent in a state across all visits, `retry_limits` caps how often the driver
+    may report a failed attempt in a state through `retry` and `max_steps` caps how many steps
+    the whole run may take.  `over_limit()` tells the driver of the machine when to give up, the
+    machine itself never acts on the outside world.
+    """
+
+    def __init__(
+        self,
+        name,
+        initial,
+        deadlines=None,
+        retry_limits=None,
+        max_steps=None,
+        clock=time.time,
+    ):
+        self.name = name
+        self.deadlines = deadlines or {}
+        self.retry_limits = retry_limits or {}
+        self.max_steps = max_steps
+        self.clock = clock
+        self.state = initial
+        self.entered = clock()
+        self.steps = 0
+        self.transitions = 0
+        self.visits = defaultdict(int)
+        self.visits[initial] = 1
+        self.retries = defaultdict(int)
+        self.time_in = defaultdict(float)
+
+    def transition(self, state):
+        """Moves to `state`, returning how long the previous state lasted.  Returns None when
+        the machine is already in `state`, the current visit simply goes on"""
+        self.steps += 1
+        if state == self.state:
+            return None
+        now = self.clock()
+        elapsed = now - self.entered
+        self.time_in[self.state] += elapsed
+        metrics.record_timing(
+            f"{self.name}.transition",
+            elapsed,
+            source=state_name(self.state),
+            target=state_name(state),
+        )
+        self.state = state
+        self.entered = now
+        self.transitions += 1
+        self.visits[state] += 1
+        return elapsed
+
+    def retry(self, state=None):
+        """Records a failed attempt in a state, the current one by default"""
+        self.retries[self.state if state is None else state] += 1
+
+    def time_in_state(self, state=None):
+        """Total time spent in a state, including the current visit"""
+        state = self.state if state is None else state
+        total = self.time_in[state]
+        if state == self.state:
+            total += self.clock() - self.entered
+        return total
+
+    def remaining(self, state=None):
+        """Seconds left before the state's deadline, None if it has none"""
+        state = self.state if state is None else state
+        deadline = self.deadlines.get(state)
+        if deadline is None:
+            return None
+        return max(0.0, deadline - self.time_in_state(state))
+
+    def over_limit(self):
+        """Returns why the run should stop, or None while it is within its limits"""
+        label = state_name(self.state)
+        limit = self.retry_limits.get(self.state)
+        if limit is not None and self.retries[self.state] > limit:
+            return f"{label} failed {self.retries[self.state]} times"
+        if self.remaining() == 0:
+            return f"{label} took longer than {self.deadlines[self.state]} seconds"
+        if self.max_steps is not None and self.steps > self.max_steps:
+            return f"{self.steps} steps without finishing"
+        return None
+
+    def finish(self, state):
+        """Ends the run in a final state, recording the last transition and the total time"""
+        self.transition(state)
+        metrics.record_timing(
+            f"{self.name}.total", sum(self.time_in.values()), result=state_name(state)
+        )
+
+
+def state_name(state):
+    return getattr(state, "name", str(state))
@@ -0,0 +1,170 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+
+import os
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+
+from utils.check_journal import read_checks
+from utils.logger import LOG_DIR, LOG_FILE_NAME
+from utils.metrics import parse_record, percentile
+
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+# Outcomes that mean the check ran out of time rather than finding an answer
+TIMEOUT_OUTCOMES = {"timeout", "load_failure"}
+DRIVER_RESTART_EVENTS = ["driver.restart", "driver.recycle", "driver.standby_swap"]
+STOCK_CHECK_TIMINGS = ["stock_check.browser", "stock_check.http"]
+
+
+def get_log_files(log_dir=LOG_DIR, name=LOG_FILE_NAME):
+    """The current log and its rotated siblings, oldest first"""
+    rotated = []
+    for file_name in os.listdir(log_dir):
+        suffix = file_name[len(name) + 1 :]
+        if file_name.startswith(name + ".") and suffix.isdigit():
+            rotated.append((int(suffix), os.path.join(log_dir, file_name)))
+    paths = [path for _, path in sorted(rotated, reverse=True)]
+    if os.path.isfile(os.path.join(log_dir, name)):
+        paths.append(os.path.join(log_dir, name))
+    return paths
+
+
+def iter_metric_records(paths, since, until):
+    """Yields (timestamp, kind, name, value, labels) for the metric records logged in a time
+    window.  Files are read a line at a time, and only lines carrying a record are parsed
+    """
+    for path in paths:
+        with open(path, errors="replace") as f:
+            for line in f:
+                if "|METRIC|" not in line:
+                    continue
+                # asctime|version|level|message, and the message has pipes of its own
+                parts = line.split("|", 3)
+                if len(parts) < 4:
+                    continue
+                try:
+                    timestamp = datetime.strptime(parts[0], LOG_TIME_FORMAT).timestamp()
+                except ValueError:
+                    continue
+                if not since <= timestamp < until:
+                    continue
+                record = parse_record(parts[3])
+                if record:
+                    yield (timestamp, *record)
+
+
+class RunStats:
+    def __init__(self):
+        self.checks = defaultdict(int)
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+        self.latencies = defaultdict(list)
+        self.checkout_stages = defaultdict(list)
+        self.checkout_totals = defaultdict(list)
+        self.driver_restarts = defaultdict(int)
+        self.check_source = "log"
+
+    def add_record(self, name, value, labels):
+        asin = labels.get("asin")
+        if name in STOCK_CHECK_TIMINGS and asin:
+            self.latencies[asin].append(value)
+        elif name == "stock_check.outcome" and asin:
+            self.checks[asin] += 1
+            self.outcomes[asin][labels.get("outcome", "")] += 1
+        elif name == "checkout.transition":
+            self.checkout_stages[labels.get("source", "")].append(value)
+        elif name == "checkout.total":
+            self.checkout_totals[labels.get("result", "")].append(value)
+        elif name in DRIVER_RESTART_EVENTS:
+            self.driver_restarts[name] += 1
+
+    def merge_journal(self, path, since, until):
+        """Merges in the stock check journal.  Both sources describe the same checks, so for each
+        ASIN the counts, outcomes and latencies all come from whichever saw more of them.  Mixing
+        sources would compute percentiles over a partial sample
+        """
+        checks = defaultdict(int)
+        outcomes = defaultdict(lambda: defaultdict(int))
+        latencies = defaultdict(list)
+        try:
+            for check in read_checks(path, since, until):
+                asin = check["asin"]
+                checks[asin] += 1
+                outcomes[asin][check["outcome"]] += 1
+                if check["latency"] is not None:
+                    latencies[asin].append(check["latency"])
+        except sqlite3.Error:
+            return False
+        if not checks:
+            return False
+        for asin, count in checks.items():
+            if count > max(self.checks.get(asin, 0), len(self.latencies.get(asin, []))):
+                self.checks[asin] = count
+                self.outcomes[asin] = outcomes[asin]
+                self.latencies[asin] = latencies[asin]
+        self.check_source = "log and journal"
+        return True
+
+    def report(self):
+        lines = [f"Stock checks (from the {self.check_source}):"]
+        for asin in sorted(self.checks.keys() | self.latencies.keys()):
+            count = self.checks.get(asin, 0) or len(self.latencies[asin])
+            timeouts = sum(
+                n
+                for outcome, n in self.outcomes[asin].items()
+                if outcome in TIMEOUT_OUTCOMES
+            )
+            line = f"--{asin}: {count} checks"
+            if self.outcomes[asin]:
+                line += f", {timeouts / count:.1%} timed out"
+            lines.append(line + format_percentiles(self.latencies[asin]))
+        lines.append("Checkout stages:")
+        for stage in sorted(self.checkout_stages):
+            samples = self.checkout_stages[stage]
+            lines.append(f"--{stage}: n={len(samples)}{format_percentiles(samples)}")
+        for result in sorted(self.checkout_totals):
+            samples = self.checkout_totals[result]
+            lines.append(
+                f"--total ({result}): n={len(samples)}{format_percentiles(samples)}"
+            )
+        lines.append("Driver restarts:")
+        for name in DRIVER_RESTART_EVENTS:
+            lines.append(f"--{name}: {self.driver_restarts.get(name, 0)}")
+        return lines
+
+
+def format_percentiles(samples):
+    if not samples:
+        return ""
+    return (
+        f", p50={percentile(samples, 50):.3f}s p95={percentile(samples, 95):.3f}s "
+        f"max={max(samples):.3f}s"
+    )
+
+
+def collect_stats(since, until, log_paths=None, journal_path=None):
+    stats = RunStats()
+    for _, _, name, value, labels in iter_metric_records(
+        get_log_files() if log_paths is None else log_paths, since, until
+    ):
+        stats.add_record(name, value, labels)
+    if journal_path and os.path.isfile(journal_path):
+        stats.merge_journal(journal_path, since, until)
+    return stats
@@ -0,0 +1,163 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import json
+import time
+from collections import defaultdict, deque
+from statistics import median
+
+from utils.logger import log
+from utils.metrics import metrics
+
+DEFAULT_BASELINE_SAMPLES = 20
+DEFAULT_RECENT_SAMPLES = 10
+DEFAULT_REGRESSION_THRESHOLD = (
+    0.5  # alert when the recent median is 50% over the baseline
+)
+DEFAULT_ALERT_COOLDOWN = 3600  # seconds between alerts for the same value
+
+# Values from Performance.getMetrics that are running totals rather than current readings
+CUMULATIVE_METRICS = ["LayoutDuration", "RecalcStyleDuration", "ScriptDuration"]
+# Values that are watched for regressions, everything else is only recorded
+WATCHED_VALUES = ["bytes", "render_time"]
+UNITS = {
+    "bytes": "B",
+    "js_heap": "B",
+    "render_time": "s",
+    "script_time": "s",
+}
+
+
+def parse_performance_metrics(result):
+    """Turns a Performance.getMetrics result into a {name: value} dict"""
+    return {entry["name"]: entry["value"] for entry in result.get("metrics", [])}
+
+
+def summarize_network_log(entries, target_id=None):
+    """Counts requests and bytes received in a batch of Chrome performance log entries.  The log
+    covers the whole browser, `target_id` keeps only the entries of one tab"""
+    requests = 0
+    received = 0
+    for entry in entries:
+        try:
+            record = json.loads(entry["message"])
+            message = record["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if target_id and record.get("webview") != target_id:
+            continue
+        method = message.get("method")
+        if method == "Network.requestWillBeSent":
+            requests += 1
+        elif method == "Network.loadingFinished":
+            received += message.get("params", {}).get("encodedDataLength", 0)
+    return requests, received
+
+
+class PageTelemetry:
+    """Aggregates browser resource use per page type and alerts when a page gets heavier or
+    slower than it used to be.
+
+    The first `baseline_samples` readings of each page type form its baseline.  After that, when
+    the median of the last `recent_samples` readings of a watched value is more than `threshold`
+    above the baseline median, `on_alert(message)` is called, at most once per `alert_cooldown`.
+    """
+
+    def __init__(
+        self,
+        baseline_samples=DEFAULT_BASELINE_SAMPLES,
+        recent_samples=DEFAULT_RECENT_SAMPLES,
+        threshold=DEFAULT_REGRESSION_THRESHOLD,
+        alert_cooldown=DEFAULT_ALERT_COOLDOWN,
+        on_alert=None,
+        clock=time.time,
+    ):
+        self.baseline_samples = baseline_samples
+        self.threshold = threshold
+        self.alert_cooldown = alert_cooldown
+        self.on_alert = on_alert
+        self.clock = clock
+        self.baselines = defaultdict(list)
+        self.recent = defaultdict(lambda: deque(maxlen=recent_samples))
+        self.last_alert = {}
+        self.previous_totals = {}
+
+    def performance_deltas(self, performance):
+        """Converts the running totals in a Performance.getMetrics reading into time spent since
+        the previous reading"""
+        deltas = {}
+        for name in CUMULATIVE_METRICS:
+            value = performance.get(name, 0)
+            previous = self.previous_totals.get(name, 0)
+            # Totals start over in a new renderer
+            deltas[name] = value - previous if value >= previous else value
+            self.previous_totals[name] = value
+        return deltas
+
+    def record(self, page_type, performance=None, network=None):
+        """Records one visit of a page type.  `performance` is a parsed Performance.getMetrics
+        result and `network` a (requests, bytes) tuple"""
+        values = {}
+        if performance:
+            deltas = self.performance_deltas(performance)
+            values["js_heap"] = performance.get("JSHeapUsedSize", 0)
+            values["nodes"] = performance.get("Nodes", 0)
+            values["render_time"] = (
+                deltas["LayoutDuration"] + deltas["RecalcStyleDuration"]
+            )
+            values["script_time"] = deltas["ScriptDuration"]
+        if network:
+            values["requests"], values["bytes"] = network
+        for name, value in values.items():
+            metrics.record_sample(
+                f"telemetry.{page_type}.{name}", value, unit=UNITS.get(name, "")
+            )
+            if name in WATCHED_VALUES:
+                self.check_regression(page_type, name, value)
+        return values
+
+    def check_regression(self, page_type, name, value):
+        key = (page_type, name)
+        baseline = self.baselines[key]
+        if len(baseline) < self.baseline_samples:
+            baseline.append(value)
+            return False
+        recent = self.recent[key]
+        recent.append(value)
+        if len(recent) < recent.maxlen:
+            return False
+        baseline_median = median(baseline)
+        recent_median = median(recent)
+        if not baseline_median or recent_median <= baseline_median * (
+            1 + self.threshold
+        ):
+            return False
+        now = self.clock()
+        if now - self.last_alert.get(key, 0) < self.alert_cooldown:
+            return False
+        self.last_alert[key] = now
+        metrics.record_event("telemetry.regression", page=page_type, value=name)
+        message = (
+            f"The {page_type} page {name.replace('_', ' ')} went from a median of "
+            f"{baseline_median:.4g} to {recent_median:.4g}, the site may have changed"
+        )
+        log.warning(message)
+        if self.on_alert:
+            self.on_alert(message)
+        return True
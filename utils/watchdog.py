@@ -0,0 +1,141 @@
+#      FairGame - Automated Purchasing Program
+#      Copyright (C) 2021  Hari Nagarajan
+#
+#      This program is free software: you can redistribute it and/or modify
+#      it under the terms of the GNU General Public License as published by
+#      the Free Software Foundation, either version 3 of the License, or
+#      (at your option) any later version.
+#
+#      This program is distributed in the hope that it will be useful,
+#      but WITHOUT ANY WARRANTY; without even the implied warranty of
+#      MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#      GNU General Public License for more details.
+#
+#      You should have received a copy of the GNU General Public License
+#      along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+#      The author may be contacted through the project's GitHub, at:
+#      https://github.com/Hari-Nagarajan/fairgame
+
+import threading
+
+import psutil
+
+from utils.logger import log
+from utils.metrics import metrics
+
+DEFAULT_SAMPLE_INTERVAL = 30  # seconds
+DEFAULT_CPU_SAMPLES = 4  # consecutive samples over the CPU limit before recycling
+
+
+class ResourceWatchdog:
+    """Samples memory and CPU use of a process tree in a background thread.
+
+    `get_root_pid` returns the PID at the top of the tree (chromedriver), or None when there is
+    no browser.  Children are looked up on every sample since Chrome keeps starting and stopping
+    renderers.  Totals are published as `browser.*` gauges.  When resident memory goes over
+    `max_rss_mb`, or CPU stays over `max_cpu_percent` for `cpu_samples` samples in a row, a
+    recycle is requested.  The watchdog never acts on the browser itself, the owner picks the
+    request up with `take_recycle_request()` at a point where restarting is safe.
+    """
+
+    def __init__(
+        self,
+        get_root_pid,
+        interval=DEFAULT_SAMPLE_INTERVAL,
+        max_rss_mb=0,
+        max_cpu_percent=0,
+        cpu_samples=DEFAULT_CPU_SAMPLES,
+    ):
+        self.get_root_pid = get_root_pid
+        self.interval = interval
+        self.max_rss_mb = max_rss_mb
+        self.max_cpu_percent = max_cpu_percent
+        self.cpu_samples = cpu_samples
+        self.processes = {}
+        self.busy_samples = 0
+        self.recycle_reason = None
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                log.debug(f"Resource watchdog sample failed: {e}")
+
+    def get_tree(self, root_pid):
+        root = psutil.Process(root_pid)
+        tree = [root] + root.children(recursive=True)
+        # Reuse Process objects so cpu_percent measures since the previous sample
+        processes = {}
+        for process in tree:
+            processes[process.pid] = self.processes.get(process.pid, process)
+        self.processes = processes
+        return list(processes.values())
+
+    def sample(self):
+        """Takes one sample, returning (rss in MB, cpu percent) or None without a browser"""
+        root_pid = self.get_root_pid()
+        if root_pid is None:
+            self.processes = {}
+            return None
+        rss = 0
+        cpu = 0.0
+        count = 0
+        for process in self.get_tree(root_pid):
+            try:
+                rss += process.memory_info().rss
+                cpu += process.cpu_percent(interval=None)
+                count += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        rss_mb = rss / (1024 * 1024)
+        metrics.set_gauge("browser.rss_mb", round(rss_mb, 1))
+        metrics.set_gauge("browser.cpu_percent", round(cpu, 1))
+        metrics.set_gauge("browser.processes", count)
+        log.debug(
+            f"Browser resources: {rss_mb:.0f} MB across {count} processes, {cpu:.0f}% CPU"
+        )
+
+        if self.max_cpu_percent and cpu > self.max_cpu_percent:
+            self.busy_samples += 1
+        else:
+            self.busy_samples = 0
+        if self.max_rss_mb and rss_mb > self.max_rss_mb:
+            self.request_recycle(
+                f"browser memory {rss_mb:.0f} MB is over {self.max_rss_mb} MB"
+            )
+        elif self.busy_samples >= self.cpu_samples:
+            self.request_recycle(
+                f"browser CPU has been over {self.max_cpu_percent}% for {self.busy_samples} samples"
+            )
+        return rss_mb, cpu
+
+    def request_recycle(self, reason):
+        with self.lock:
+            if self.recycle_reason is None:
+                log.info(f"Browser recycle scheduled: {reason}")
+                self.recycle_reason = reason
+
+    def take_recycle_request(self):
+        """Returns the reason for a pending recycle request, clearing it, or None"""
+        with self.lock:
+            reason = self.recycle_reason
+            self.recycle_reason = None
+        if reason:
+            self.busy_samples = 0
+            self.processes = {}
+        return reason